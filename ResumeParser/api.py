@@ -1,13 +1,74 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from typing import Optional
-from PyPDF2 import PdfReader
-from io import BytesIO
-import re
-from skills_keywords import skills_keywords
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from typing import List, Optional
+import asyncio
+import os
+from parse_cache import ParseCache
+from document_store import DocumentStore, FileBackend, MemoryBackend
+from text_extraction import extract_document_pages, call_with_document
+from budgets import run_budgeted
+from extractors import (
+    find_candidate_name, find_skills, find_certifications, analyze_resumes, analyze_document,
+    find_candidate_name_in_document, find_certifications_in_document, find_fingerprint,
+)
+from scoring import extract_normalized_skills, normalize_skills, calculate_matching_score, rank_candidates
+from skill_index import SkillIndex
+from near_duplicates import NearDuplicateIndex, collapse_near_duplicates, default_threshold
+import metrics
+from worker_pool import ExtractionPool, PoolBusyError, PoolTimeoutError
+from uploads import spool_upload, max_upload_bytes, UploadTooLargeError
+from job_queue import JobQueue, JobWorkers
 
 app = FastAPI()
 
-uploaded_file_content = None
+# Uploaded resumes by document ID. Set DOCUMENT_STORE_DIR to share them
+# between uvicorn workers through a local directory.
+document_store = DocumentStore(
+    backend=FileBackend(os.environ["DOCUMENT_STORE_DIR"]) if os.environ.get("DOCUMENT_STORE_DIR") else MemoryBackend(),
+    ttl_seconds=int(os.environ.get("DOCUMENT_TTL_SECONDS", 3600)),
+    max_bytes=int(os.environ.get("DOCUMENT_STORE_MAX_BYTES", 256 * 1024 * 1024)),
+)
+
+# Parsed pages and extracted fields, keyed by a hash of the document bytes
+parse_cache = ParseCache(
+    max_bytes=int(os.environ.get("PARSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    cache_dir=os.environ.get("PARSE_CACHE_DIR") or None,
+)
+
+# Candidates searchable by skill, persisted in SQLite
+skill_index = SkillIndex(os.environ.get("SKILL_INDEX_PATH", "skill_index.db"))
+
+# Fingerprints of the indexed candidates, so a resume resubmitted with small changes
+# is recognised instead of indexed again, and near-identical resumes in a batch are
+# ranked once
+near_duplicate_threshold = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", default_threshold))
+near_duplicate_index = NearDuplicateIndex(os.environ.get("NEAR_DUPLICATE_INDEX_PATH", "near_duplicates.db"), near_duplicate_threshold)
+
+# Worker processes that run PDF parsing and field extraction off the event loop
+extraction_pool = ExtractionPool(
+    max_workers=int(os.environ.get("EXTRACTION_WORKERS", 0)) or None,
+    max_pending=int(os.environ.get("EXTRACTION_MAX_PENDING", 0)) or None,
+    timeout=float(os.environ.get("EXTRACTION_TIMEOUT_SECONDS", 30)),
+)
+
+# Queued extraction jobs and their results, persisted in SQLite, and the local
+# worker processes that run them
+job_queue_path = os.environ.get("JOB_QUEUE_PATH", "jobs.db")
+job_max_attempts = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+job_lease_seconds = float(os.environ.get("JOB_LEASE_SECONDS", 300))
+job_queue = JobQueue(job_queue_path, max_attempts=job_max_attempts, lease_seconds=job_lease_seconds)
+job_workers = JobWorkers(
+    job_queue_path,
+    concurrency=int(os.environ.get("JOB_WORKERS", 2)),
+    max_attempts=job_max_attempts,
+    lease_seconds=job_lease_seconds,
+)
+
+# Uploads are spooled here (default: the system temp directory) while they are parsed
+upload_spool_dir = os.environ.get("UPLOAD_SPOOL_DIR") or None
+
+# Set TIMING_HEADERS=1 to return each request's per-stage timings in a Server-Timing header
+timing_headers = os.environ.get("TIMING_HEADERS", "") not in ("", "0")
 
 # Custom exceptions
 class ResumeUploadError(Exception):
@@ -15,83 +76,379 @@ class ResumeUploadError(Exception):
         self.status_code = 400
         self.detail = "Please upload a PDF resume first"
 
+class ResumeNotFoundError(Exception):
+    def __init__(self):
+        self.status_code = 404
+        self.detail = "Resume not found, it may have expired. Please upload it again"
+
 class ResumeProcessingError(Exception):
     def __init__(self, message):
         self.status_code = 500
         self.detail = message
 
-# Function to upload the PDF resume
-@app.post("/upload_resume/")
-async def upload_resume(file: UploadFile):
-    global uploaded_file_content
+# Errors that already carry the right status code and must not become a 500
+passthrough_errors = (ResumeNotFoundError, PoolBusyError, PoolTimeoutError, UploadTooLargeError)
+
+# Function to spool an uploaded file to disk, within the upload size limit
+async def receive_upload(file):
     try:
-        uploaded_file_content = await file.read()
-        return {"message": "File uploaded successfully!"}
+        return await spool_upload(file, max_upload_bytes, upload_spool_dir)
+    except UploadTooLargeError:
+        raise
     except Exception as e:
         raise ResumeUploadError()
 
+# Function to locate an uploaded resume: documents kept on disk are returned by path
+# (and parsed in place), in-memory ones by content. Also returns the parse cache key,
+# the hash taken when the document was uploaded.
+def get_document(document_id):
+    path = document_store.get_path(document_id)
+    content = document_store.get_content(document_id) if path is None else None
+    key = document_store.get_sha256(document_id)
+    if (path is None and content is None) or key is None:
+        raise ResumeNotFoundError()
+    return path, content, key
+
+# Function to run fn(document, *args) in the worker pool within the per-document
+# budget (see budgets.py), sending the worker the document's path rather than its
+# bytes when it is on disk. Returns fn's result and the budget's flags.
+async def run_on_document(fn, path, content, *args):
+    if path is not None:
+        return await extraction_pool.run(run_budgeted, None, call_with_document, fn, path, *args)
+    return await extraction_pool.run(run_budgeted, None, fn, content, *args)
+
+# Function to keep a computed field in the parse cache. Fields cut short by the page or
+# character limit are kept with a flag; those cut short by the clock are not kept.
+def cache_field(key, name, value, flags):
+    if flags["timed_out"]:
+        return
+    parse_cache.put_field(key, name, value)
+    if flags["truncated"]:
+        parse_cache.put_field(key, name + "_truncated", True)
+
+# Function to get the budget flags of a field or of the pages cached for a document
+def cached_flags(entry, name):
+    return {"truncated": bool(entry and entry["fields"].get(name + "_truncated")), "timed_out": False}
+
+# Function to mark a response as partial when the document's budget ran out
+def with_budget_flags(response, flags):
+    response.update({flag: True for flag, value in flags.items() if value})
+    return response
+
+# Function to parse all pages of a resume in the worker pool and keep them for later calls
+async def load_document_pages(document_id, path, content, key):
+    pages, flags = await run_on_document(extract_document_pages, path, content)
+    if not flags["timed_out"]:
+        parse_cache.put_pages(key, pages)
+    if flags["truncated"]:
+        parse_cache.put_field(key, "pages_truncated", True)
+    elif not flags["timed_out"]:
+        document_store.put_pages(document_id, pages)
+    return pages, flags
+
+# Function to get a field of an uploaded resume and its budget flags. When no page
+# texts are cached yet and the field has a compute_from_content variant, that one
+# reads only the pages it needs. Callers reading several fields pass the document
+# get_document located, so it is looked up once.
+async def get_document_field(document_id, name, compute, compute_from_content=None, document=None):
+    path, content, key = document or get_document(document_id)
+    entry = parse_cache.lookup(key)
+    if entry is not None and name in entry["fields"]:
+        return entry["fields"][name], cached_flags(entry, name)
+
+    pages = entry["pages"] if entry is not None else None
+    flags = cached_flags(entry, "pages")
+    if pages is None:
+        pages = document_store.get_pages(document_id)
+    if pages is None and compute_from_content is not None:
+        value, flags = await run_on_document(compute_from_content, path, content)
+        cache_field(key, name, value, flags)
+        return value, flags
+
+    if pages is None:
+        pages, flags = await load_document_pages(document_id, path, content, key)
+    value = await extraction_pool.run(compute, pages)
+    cache_field(key, name, value, flags)
+    return value, flags
+
+# Function to upload the PDF resume
+@app.post("/upload_resume/")
+async def upload_resume(file: UploadFile):
+    with await receive_upload(file) as upload:
+        document_id = document_store.add_upload(upload)
+    return {"message": "File uploaded successfully!", "document_id": document_id}
+
 # Function to extract the candidate's name from the resume
 @app.post("/extract_candidate_name/")
-async def extract_candidate_name():
-    global uploaded_file_content
+async def extract_candidate_name(document_id: str):
     try:
-        if uploaded_file_content is None:
-            raise ResumeUploadError()
-
-        pdf = PdfReader(BytesIO(uploaded_file_content))
-        first_page_text = pdf.pages[0].extract_text()
-        name_pattern = r'\b[A-Z][a-zA-Z]* [A-Z][a-zA-Z]*\b'
-        candidate_name = re.search(name_pattern, first_page_text)
-        return {"candidate_name": candidate_name.group()} if candidate_name else {"error": "Name not found"}
+        candidate_name, flags = await get_document_field(document_id, "candidate_name", find_candidate_name, find_candidate_name_in_document)
+        return with_budget_flags({"candidate_name": candidate_name} if candidate_name else {"error": "Name not found"}, flags)
+    except passthrough_errors:
+        raise
     except Exception as e:
         raise ResumeProcessingError("Error while extracting candidate name")
 
 # Function to extract skills from the resume
 @app.post("/extract_candidate_skills/")
-async def extract_candidate_skills():
-    global uploaded_file_content
+async def extract_candidate_skills(document_id: str):
     try:
-        if uploaded_file_content is None:
-            raise ResumeUploadError()
-
-        pdf = PdfReader(BytesIO(uploaded_file_content))
-        text = ""
-        for page in pdf.pages:
-            text += page.extract_text()
-        skills = [skill for skill in skills_keywords if re.search(rf'\b{skill}\b', text, re.IGNORECASE)]
-        return {"skills": skills}
+        skills, flags = await get_document_field(document_id, "skills", find_skills)
+        return with_budget_flags({"skills": skills}, flags)
+    except passthrough_errors:
+        raise
     except Exception as e:
         raise ResumeProcessingError("Error while extracting skills")
 
 # Function to extract certifications, hobbies, and interests from the resume
 @app.post("/extract_certifications_hobbies_interests/")
-async def extract_certifications_hobbies_interests(max_certifications: Optional[int] = 3):
-    global uploaded_file_content
+async def extract_certifications_hobbies_interests(document_id: str, max_certifications: Optional[int] = 3):
     try:
-        if uploaded_file_content is None:
-            raise ResumeUploadError()
-
-        pdf = PdfReader(BytesIO(uploaded_file_content))
-        text = ""
-        for page in pdf.pages:
-            text += page.extract_text()
-        
-        # Define a regular expression pattern to extract certifications, hobbies, and interests section
-        certifications_pattern = r'(?i)CERTIFICATES[\s\S]*?(?=Skills|$)'
-        certifications_match = re.search(certifications_pattern, text, re.IGNORECASE | re.DOTALL)
-        
-        if certifications_match:
-            certifications_text = certifications_match.group(0)
-            # Split certifications using newline characters
-            certifications_list = [cert.strip() for cert in certifications_text.split('\n') if cert.strip()]
-            # Remove the first certification
-            certifications_list = certifications_list[1:]
-            return {"certifications_hobbies_interests": certifications_list[:max_certifications]}
+        certifications_list, flags = await get_document_field(document_id, "certifications", find_certifications, find_certifications_in_document)
+
+        if certifications_list is not None:
+            return with_budget_flags({"certifications_hobbies_interests": certifications_list[:max_certifications]}, flags)
+        elif flags["truncated"] or flags["timed_out"]:
+            # The section may be in the part of the document the budget didn't reach
+            return with_budget_flags({"certifications_hobbies_interests": None}, flags)
         else:
             raise ResumeProcessingError("Certifications, hobbies, and interests section not found in the resume.")
+    except passthrough_errors:
+        raise
     except Exception as e:
         raise ResumeProcessingError("Error while extracting certifications, hobbies, and interests")
 
+# Fields /analyze/ can return, and the parse cache field each one is kept under
+analysis_fields = {
+    "name": "candidate_name",
+    "skills": "normalized_skills",
+    "certifications": "certifications",
+    "sections": "sections",
+    "score": "normalized_skills",
+}
+
+# Function to turn the comma-separated fields parameter into a list of analysis fields
+def parse_requested_fields(fields, job_description):
+    if fields is None:
+        return [field for field in analysis_fields if field != "score" or job_description]
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in analysis_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(analysis_fields)}")
+    if "score" in requested and not job_description:
+        raise HTTPException(status_code=400, detail="A job_description is required to compute the score")
+    return requested
+
+# Function to compute every requested field of a resume from a single parse
+@app.post("/analyze/")
+async def analyze(
+    file: UploadFile,
+    job_description: Optional[str] = Form(None),
+    fields: Optional[str] = None,
+    max_certifications: Optional[int] = 3,
+):
+    requested = parse_requested_fields(fields, job_description)
+    upload = await receive_upload(file)
+    try:
+        key = upload.sha256
+        entry = parse_cache.lookup(key)
+        cached = dict(entry["fields"]) if entry is not None else {}
+        pages = entry["pages"] if entry is not None else None
+
+        # Fields read from the cache are partial if they were when they were cached
+        truncated = any(cached.get(analysis_fields[field] + "_truncated", False) for field in requested)
+        timed_out = False
+
+        # Only what the cache doesn't already hold goes to the worker pool; the score
+        # is computed here from the skills, so the worker is asked for those
+        missing = sorted(set("skills" if field == "score" else field for field in requested if analysis_fields[field] not in cached))
+        if missing:
+            if pages is None:
+                (computed, parsed_pages), flags = await run_on_document(analyze_document, upload.path, None, missing)
+                if parsed_pages is not None and not flags["timed_out"]:
+                    parse_cache.put_pages(key, parsed_pages)
+                    if flags["truncated"]:
+                        parse_cache.put_field(key, "pages_truncated", True)
+            else:
+                computed, _ = await extraction_pool.run(analyze_document, None, missing, pages)
+                flags = cached_flags(entry, "pages")
+            for name, value in computed.items():
+                cache_field(key, name, value, flags)
+            cached.update(computed)
+            truncated = truncated or flags["truncated"]
+            timed_out = flags["timed_out"]
+
+        result = {}
+        if "name" in requested:
+            result["candidate_name"] = cached["candidate_name"]
+        if "skills" in requested:
+            result["skills"] = cached["normalized_skills"]
+        if "certifications" in requested:
+            certifications_list = cached["certifications"]
+            result["certifications"] = certifications_list[:max_certifications] if certifications_list is not None else None
+        if "sections" in requested:
+            result["sections"] = cached["sections"]
+        if "score" in requested:
+            job_skills = extract_normalized_skills(job_description)
+            result["score"], result["common_skills"] = calculate_matching_score(cached["normalized_skills"], job_skills)
+        result["truncated"] = truncated
+        result["timed_out"] = timed_out
+        return result
+    except passthrough_errors:
+        raise
+    except Exception as e:
+        raise ResumeProcessingError("Error while analyzing the resume")
+    finally:
+        upload.close()
+
+# Function to score many resumes against one job description and rank them
+@app.post("/analyze_batch/")
+async def analyze_batch(files: List[UploadFile] = File(...), job_description: str = Form(...)):
+    uploads = []
+    try:
+        for file in files:
+            uploads.append(await receive_upload(file))
+        resumes = [(file.filename, upload.path) for file, upload in zip(files, uploads)]
+
+        job_skills = extract_normalized_skills(job_description)
+
+        # Split the resumes into one chunk per worker so each pool call carries many documents
+        chunk_count = min(len(resumes), extraction_pool.max_workers) or 1
+        chunks = [resumes[i::chunk_count] for i in range(chunk_count)]
+        results = await asyncio.gather(*[
+            extraction_pool.run(analyze_resumes, chunk, job_skills, timeout=extraction_pool.timeout * len(chunk))
+            for chunk in chunks if chunk
+        ])
+
+        analyzed = [result for chunk_results in results for result in chunk_results]
+        ranked = rank_candidates([result for result in analyzed if "error" not in result])
+        return {
+            "job_skills": job_skills,
+            "candidates": collapse_near_duplicates(ranked, near_duplicate_threshold),
+            "errors": [result for result in analyzed if "error" in result],
+        }
+    except passthrough_errors:
+        raise
+    except Exception as e:
+        raise ResumeProcessingError("Error while analyzing resumes")
+    finally:
+        for upload in uploads:
+            upload.close()
+
+# Function to queue resumes for analysis and return their job IDs without waiting for
+# the results; poll /jobs/{job_id} for them
+@app.post("/jobs/", status_code=202)
+async def submit_jobs(
+    files: List[UploadFile] = File(...),
+    job_description: Optional[str] = Form(None),
+    fields: Optional[str] = None,
+):
+    requested = parse_requested_fields(fields, job_description)
+    jobs = []
+    for file in files:
+        with await receive_upload(file) as upload:
+            job_id = job_queue.submit(upload, file.filename, requested, job_description)
+        jobs.append({"job_id": job_id, "filename": file.filename})
+    return {"jobs": jobs}
+
+# Function to get the status of a queued job, with its result or error once it has one
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# Function to add an uploaded resume to the candidate index; its document hash is the
+# candidate ID. A near-duplicate of an indexed resume isn't indexed again: the response
+# names the candidate it duplicates instead.
+@app.post("/index_candidate/")
+async def index_candidate(document_id: str):
+    try:
+        document = get_document(document_id)
+        candidate_id = document[2]
+        fingerprint, fingerprint_flags = await get_document_field(document_id, "fingerprint", find_fingerprint, document=document)
+        duplicate = near_duplicate_index.find(fingerprint, exclude=candidate_id)
+        if duplicate is not None:
+            return with_budget_flags({"candidate_id": duplicate["document_id"], "duplicate": True, "similarity": duplicate["similarity"]}, fingerprint_flags)
+
+        skills, skills_flags = await get_document_field(document_id, "skills", find_skills, document=document)
+        candidate_name, name_flags = await get_document_field(document_id, "candidate_name", find_candidate_name, find_candidate_name_in_document, document)
+        skill_index.add_candidate(candidate_id, normalize_skills(skills), candidate_name)
+        if fingerprint is not None:
+            near_duplicate_index.add(candidate_id, fingerprint)
+        flags = {flag: skills_flags[flag] or name_flags[flag] or fingerprint_flags[flag] for flag in skills_flags}
+        return with_budget_flags({"candidate_id": candidate_id}, flags)
+    except passthrough_errors:
+        raise
+    except Exception as e:
+        raise ResumeProcessingError("Error while indexing candidate")
+
+# Function to remove a candidate from the index
+@app.delete("/index_candidate/{candidate_id}")
+async def remove_indexed_candidate(candidate_id: str):
+    near_duplicate_index.remove(candidate_id)
+    if not skill_index.remove_candidate(candidate_id):
+        raise HTTPException(status_code=404, detail="Candidate not found in the index")
+    return {"message": "Candidate removed from the index"}
+
+# Function to find the indexed candidates that best match a job description
+@app.post("/top_candidates/")
+async def top_candidates(job_description: str = Form(...), k: int = Form(10)):
+    return {
+        "job_skills": extract_normalized_skills(job_description),
+        "candidates": skill_index.query(job_description, k),
+    }
+
+# Function to check that the API is up; served without touching the worker pool
+@app.get("/health/")
+async def health():
+    return {"status": "ok", "extraction_pool": extraction_pool.stats(), "jobs": job_queue.stats()}
+
+# Function to expose stage latency histograms and counters to Prometheus
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+# Function to report the parse cache hit/miss counters
+@app.get("/cache_stats/")
+async def cache_stats():
+    return parse_cache.stats()
+
+# Reject single-resume uploads whose declared size is already over the limit, before
+# the request body is read at all
+@app.middleware("http")
+async def reject_oversized_uploads(request, call_next):
+    content_length = request.headers.get("content-length")
+    if request.url.path in ("/upload_resume/", "/analyze/") and content_length and content_length.isdigit():
+        # Leave room for the multipart framing and the other form fields
+        if int(content_length) > max_upload_bytes + 1024 * 1024:
+            error = UploadTooLargeError(max_upload_bytes)
+            return JSONResponse(status_code=error.status_code, content={"error": error.detail})
+    return await call_next(request)
+
+# Record the stages of every request, and optionally report them back to the client
+@app.middleware("http")
+async def record_request_timings(request, call_next):
+    recorder = metrics.start_recording()
+    with metrics.timed("request"):
+        response = await call_next(request)
+    if timing_headers:
+        response.headers["Server-Timing"] = recorder.server_timing()
+    return response
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_workers.start()
+
+@app.on_event("shutdown")
+async def shutdown_extraction_pool():
+    extraction_pool.shutdown()
+    job_workers.stop()
+    job_queue.close()
+    skill_index.close()
+    near_duplicate_index.close()
+
 # Error handling for custom exceptions
 @app.exception_handler(ResumeUploadError)
 async def handle_resume_upload_error(request, exc):
@@ -100,6 +457,13 @@ async def handle_resume_upload_error(request, exc):
         content={"error": exc.detail},
     )
 
+@app.exception_handler(ResumeNotFoundError)
+async def handle_resume_not_found_error(request, exc):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": exc.detail},
+    )
+
 @app.exception_handler(ResumeProcessingError)
 async def handle_resume_processing_error(request, exc):
     return JSONResponse(
@@ -107,3 +471,24 @@ async def handle_resume_processing_error(request, exc):
         content={"error": exc.detail},
     )
 
+@app.exception_handler(PoolBusyError)
+async def handle_pool_busy_error(request, exc):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": exc.detail},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(PoolTimeoutError)
+async def handle_pool_timeout_error(request, exc):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": exc.detail},
+    )
+
+@app.exception_handler(UploadTooLargeError)
+async def handle_upload_too_large_error(request, exc):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": exc.detail},
+    )
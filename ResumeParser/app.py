@@ -1,53 +1,39 @@
 import streamlit as st
-from PyPDF2 import PdfReader
-from io import BytesIO
-import re
-from skills_keywords import skills_keywords
+from resume import session_resume
+from uploads import UploadTooLargeError
 
-# Function to extract the candidate's name from the resume
-def extract_candidate_name(uploaded_file):
+# Function to get the uploaded resume, parsed once and kept across button clicks
+def load_resume(uploaded_file):
     try:
-        resume_content = uploaded_file.read()
-        pdf = PdfReader(BytesIO(resume_content))
-        first_page_text = pdf.pages[0].extract_text()
-        name_pattern = r'\b[A-Z][a-zA-Z]* [A-Z][a-zA-Z]*\b'
-        candidate_name = re.search(name_pattern, first_page_text)
-        return candidate_name.group() if candidate_name else "Name not found"
+        return session_resume(st.session_state, uploaded_file)
+    except UploadTooLargeError as e:
+        return {"error": e.detail}
+    except Exception as e:
+        return {"error": str(e)}
+
+# Function to extract the candidate's name from the resume; only the first page is read
+def extract_candidate_name(resume):
+    try:
+        candidate_name = resume.name
+        return candidate_name if candidate_name else "Name not found"
     except Exception as e:
         return {"error": str(e)}
 
 # Function to extract skills from the resume
-def extract_candidate_skills(uploaded_file):
+def extract_candidate_skills(resume):
     try:
-        resume_content = uploaded_file.read()
-        text = ""
-        pdf = PdfReader(BytesIO(resume_content))
-        for page in pdf.pages:
-            text += page.extract_text()
-        skills = [skill for skill in skills_keywords if re.search(rf'\b{skill}\b', text, re.IGNORECASE)]
+        skills = resume.skills
         return skills
     except Exception as e:
         return {"error": str(e)}
 
 # Function to extract certifications from the resume
-def extract_certifications(uploaded_file, max_certifications=3):
+def extract_certifications(resume, max_certifications=3):
     try:
-        resume_content = uploaded_file.read()
-        text = ""
-        pdf = PdfReader(BytesIO(resume_content))
-        for page in pdf.pages:
-            text += page.extract_text()
-        
-        # Define a regular expression pattern to extract certifications section
-        certifications_pattern = r'(?i)CERTIFICATES[\s\S]*?(?=Skills|$)'
-        certifications_match = re.search(certifications_pattern, text, re.IGNORECASE | re.DOTALL)
-        
-        if certifications_match:
-            certifications_text = certifications_match.group(0)
-            # Split certifications using newline characters
-            certifications_list = [cert.strip() for cert in certifications_text.split('\n') if cert.strip()]
-            # Remove the first certification
-            certifications_list = certifications_list[1:]
+        # Pages are only decoded until the certifications section ends
+        certifications_list = resume.certifications
+
+        if certifications_list is not None:
             return certifications_list[:max_certifications]
         else:
             return "Certifications section not found in the resume."
@@ -72,15 +58,20 @@ uploaded_file = st.file_uploader("Upload a PDF resume", type=["pdf"])
 if uploaded_file:
     st.info("File uploaded successfully!")
 
+    resume = load_resume(uploaded_file)
+    if isinstance(resume, dict):
+        st.error("Error: " + resume["error"])
+        st.stop()
+
     if st.button("Extract Candidate Name"):
-        candidate_name = extract_candidate_name(uploaded_file)
+        candidate_name = extract_candidate_name(resume)
         if candidate_name == "Name not found":
             st.warning("Candidate name not found in the resume.")
         else:
             st.success(f"**Candidate Name:** {candidate_name}")
 
     if st.button("Extract Skills"):
-        extracted_skills = extract_candidate_skills(uploaded_file)
+        extracted_skills = extract_candidate_skills(resume)
         if "error" in extracted_skills:
             st.error("Error: " + extracted_skills["error"])
         else:
@@ -92,7 +83,7 @@ if uploaded_file:
                 st.warning("No skills found in the resume.")
 
     if st.button("Extract Certifications"):
-        certifications_info = extract_certifications(uploaded_file, max_certifications=3)
+        certifications_info = extract_certifications(resume, max_certifications=3)
         if certifications_info == "Certifications section not found in the resume.":
             st.warning(certifications_info)
         else:
@@ -102,4 +93,8 @@ if uploaded_file:
                     st.write(f"{idx}. {certification}")
             else:
                 st.warning("No certifications found in the resume.")
-                
\ No newline at end of file
+
+    if resume.flags()["truncated"]:
+        st.warning("The resume is too long; only its first part was analyzed.")
+    if resume.flags()["timed_out"]:
+        st.warning("Reading the resume took too long; only its first part was analyzed.")
@@ -1,43 +1,29 @@
 import streamlit as st
-import re
-from PyPDF2 import PdfReader
-from io import BytesIO
-import docx2txt  # Add this import for DOC file support
-from skills_keywords import skills_keywords
-
-# Function to extract text from a DOC file
-def extract_text_from_docx(uploaded_file):
-    try:
-        text = docx2txt.process(uploaded_file)
-        return text
-    except Exception as e:
-        return {"error": str(e)}
+from skill_matcher import skill_matcher
+from resume import session_resume
+from uploads import UploadTooLargeError
 
-# Function to extract text from a PDF file
-def extract_text_from_pdf(uploaded_file):
+# Function to get the uploaded resume, parsed once and kept across reruns
+def load_resume(uploaded_file):
     try:
-        resume_content = uploaded_file.read()
-        pdf = PdfReader(BytesIO(resume_content))
-        text = ""
-        for page in pdf.pages:
-            text += page.extract_text()
-        return text
+        return session_resume(st.session_state, uploaded_file)
+    except UploadTooLargeError as e:
+        return {"error": e.detail}
     except Exception as e:
         return {"error": str(e)}
 
 # Function to extract the candidate's name from the resume
-def extract_candidate_name(text):
+def extract_candidate_name(resume):
     try:
-        name_pattern = r'\b[A-Z][a-zA-Z]* [A-Z][a-zA-Z]*\b'
-        candidate_name = re.search(name_pattern, text)
-        return candidate_name.group() if candidate_name else "Name not found"
+        candidate_name = resume.name
+        return candidate_name if candidate_name else "Name not found"
     except Exception as e:
         return {"error": str(e)}
 
-# Function to extract skills from the resume text
-def extract_candidate_skills(text):
+# Function to extract skills from the resume
+def extract_candidate_skills(resume):
     try:
-        skills = [skill for skill in skills_keywords if re.search(rf'\b{skill}\b', text, re.IGNORECASE)]
+        skills = resume.skills
         return skills
     except Exception as e:
         return {"error": str(e)}
@@ -45,7 +31,7 @@ def extract_candidate_skills(text):
 # Function to extract skills from the user-provided job description text
 def extract_job_description_skills(job_description_text):
     try:
-        skills = [skill for skill in skills_keywords if re.search(rf'\b{skill}\b', job_description_text, re.IGNORECASE)]
+        skills = skill_matcher.match_keywords(job_description_text)
         return skills
     except Exception as e:
         return {"error": str(e)}
@@ -85,20 +71,24 @@ if uploaded_file and job_description_text:
     st.sidebar.write("You can now analyze:")
     if st.sidebar.button("Analyze"):
         with st.spinner("Analyzing..."):
-            # Extract text from the uploaded resume file
-            if uploaded_file.type == "application/pdf":
-                resume_text = extract_text_from_pdf(uploaded_file)
-            elif uploaded_file.type in ["application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]:
-                resume_text = extract_text_from_docx(uploaded_file)
-            else:
+            # Only PDF and DOCX can be read
+            if uploaded_file.type not in ["application/pdf", "application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]:
                 st.error("Unsupported file format. Please upload a PDF or DOC/DOCX file.")
                 st.stop()
 
+            resume = load_resume(uploaded_file)
+            if isinstance(resume, dict):
+                st.error(f"Could not read the resume: {resume['error']}")
+                st.stop()
+
             # Extract skills from the user-provided job description text
             extracted_skills_job_desc = extract_job_description_skills(job_description_text)
 
             # Extract skills from the resume text
-            extracted_skills = extract_candidate_skills(resume_text)
+            extracted_skills = extract_candidate_skills(resume)
+            if isinstance(extracted_skills, dict):
+                st.error(f"Could not read the resume: {extracted_skills['error']}")
+                st.stop()
 
             # Calculate the matching score and common skills
             score, common_skills = calculate_matching_score_and_common_skills(extracted_skills, extracted_skills_job_desc)
@@ -107,7 +97,7 @@ if uploaded_file and job_description_text:
 
             # Display results
             st.subheader("Candidate Name:")
-            candidate_name = extract_candidate_name(resume_text)
+            candidate_name = extract_candidate_name(resume)
             st.write(f"**Name:** {candidate_name}")
 
             st.subheader("Matching Score:")
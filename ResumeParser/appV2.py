@@ -1,43 +1,32 @@
 import streamlit as st
-import re
-from PyPDF2 import PdfReader
-from io import BytesIO
-import docx2txt
-from skills_keywords import skills_keywords
-
-# Function to extract text from a DOC file
-def extract_text_from_docx(uploaded_file):
+from scoring import extract_normalized_skills
+import metrics
+from resume import session_resume
+from uploads import UploadTooLargeError
+
+# Function to get the uploaded resume. The upload is spooled to disk in chunks
+# (rejected above MAX_UPLOAD_BYTES) and parsed from a memory-mapped view; the
+# resume is kept across reruns, so nothing it has extracted is extracted again.
+def load_resume(uploaded_file):
     try:
-        text = docx2txt.process(uploaded_file)
-        return text
+        return session_resume(st.session_state, uploaded_file)
+    except UploadTooLargeError as e:
+        return {"error": e.detail}
     except Exception as e:
         return {"error": str(e)}
 
-# Function to extract text from a PDF file
-def extract_text_from_pdf(uploaded_file):
+# Function to extract the candidate's name from the contact details of the resume
+def extract_candidate_name(resume):
     try:
-        resume_content = uploaded_file.read()
-        pdf = PdfReader(BytesIO(resume_content))
-        text = ""
-        for page in pdf.pages:
-            text += page.extract_text()
-        return text
+        candidate_name = resume.name
+        return candidate_name if candidate_name else "Name not found"
     except Exception as e:
         return {"error": str(e)}
 
-# Function to extract the candidate's name from the resume
-def extract_candidate_name(text):
+# Function to extract skills from the resume's skills section
+def extract_candidate_skills(resume):
     try:
-        name_pattern = r'\b[A-Z][a-zA-Z]* [A-Z][a-zA-Z]*\b'
-        candidate_name = re.search(name_pattern, text)
-        return candidate_name.group() if candidate_name else "Name not found"
-    except Exception as e:
-        return {"error": str(e)}
-
-# Function to extract skills from the resume text
-def extract_candidate_skills(text):
-    try:
-        skills = list(set([skill.lower().capitalize() for skill in skills_keywords if re.search(rf'\b{skill}\b', text, re.IGNORECASE)]))
+        skills = resume.normalized_skills
         return skills
     except Exception as e:
         return {"error": str(e)}
@@ -45,7 +34,7 @@ def extract_candidate_skills(text):
 # Function to extract skills from the user-provided job description text
 def extract_job_description_skills(job_description_text):
     try:
-        skills = list(set([skill.lower().capitalize() for skill in skills_keywords if re.search(rf'\b{skill}\b', job_description_text, re.IGNORECASE)]))
+        skills = extract_normalized_skills(job_description_text)
         return skills
     except Exception as e:
         return {"error": str(e)}
@@ -93,18 +82,28 @@ if st.sidebar.button("Analyze"):
         st.warning("Please complete both steps to analyze.")
     else:
         with st.spinner("Analyzing..."):
-            # Extract text from the uploaded resume file
-            if uploaded_file.type == "application/pdf":
-                resume_text = extract_text_from_pdf(uploaded_file)
-            elif uploaded_file.type in ["application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]:
-                resume_text = extract_text_from_docx(uploaded_file)
-            else:
+            recorder = metrics.start_recording()
+
+            # Only PDF and DOCX can be read
+            if uploaded_file.type not in ["application/pdf", "application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]:
                 st.error("Unsupported file format. Please upload a PDF or DOC/DOCX file.")
                 st.stop()
 
-            # Extract skills from the candidate's resume text
-            extracted_skills = extract_candidate_skills(resume_text)
-            
+            resume = load_resume(uploaded_file)
+            if isinstance(resume, dict):
+                st.error(f"Could not read the resume: {resume['error']}")
+                st.stop()
+
+            # Extract skills from the candidate's skills section
+            extracted_skills = extract_candidate_skills(resume)
+            if isinstance(extracted_skills, dict):
+                st.error(f"Could not read the resume: {extracted_skills['error']}")
+                st.stop()
+            if resume.flags()["truncated"]:
+                st.warning("The resume is too long; only its first part was analyzed.")
+            if resume.flags()["timed_out"]:
+                st.warning("Reading the resume took too long; only its first part was analyzed.")
+
             # Calculate the matching score
             score, common_skills = calculate_matching_score(extracted_skills, job_description_text)
 
@@ -113,7 +112,7 @@ if st.sidebar.button("Analyze"):
 
             # Candidate Name
             st.subheader("Candidate Name")
-            candidate_name = extract_candidate_name(resume_text)
+            candidate_name = extract_candidate_name(resume)
             st.write(f"The candidate's name is: {candidate_name}")
 
             # Matching Score
@@ -133,3 +132,7 @@ if st.sidebar.button("Analyze"):
                 st.write(", ".join(common_skills))
             else:
                 st.warning("No common skills found between the job description and the candidate's skills.")
+
+            # Timing Breakdown
+            with st.expander("Timing breakdown"):
+                st.table([{"Stage": stage, "Milliseconds": round(milliseconds, 2)} for stage, milliseconds in recorder.breakdown().items()])
@@ -0,0 +1,73 @@
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+from benchmarks.micro import run_micro_benchmarks
+from benchmarks.e2e import run_e2e_benchmarks
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Function to compare two result files by median (micro) or throughput (end-to-end)
+def compare(baseline_path, current_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["benchmark"], json.dumps(r["params"], sort_keys=True)): r for r in json.load(f)["results"]}
+    with open(current_path, encoding="utf-8") as f:
+        current = json.load(f)["results"]
+
+    for result in current:
+        before = baseline.get((result["benchmark"], json.dumps(result["params"], sort_keys=True)))
+        if before is None:
+            continue
+        if "median_ms" in result:
+            change = f"{before['median_ms']:.2f} ms -> {result['median_ms']:.2f} ms ({result['median_ms'] / before['median_ms']:.2f}x)"
+        else:
+            change = f"{before['docs_per_s']:.1f} -> {result['docs_per_s']:.1f} docs/s ({result['docs_per_s'] / before['docs_per_s']:.2f}x)"
+        print(f"{result['benchmark']} {result['params']}: {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the extraction benchmarks.")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--quick", action="store_true", help="smaller documents and fewer repeats")
+    parser.add_argument("--skip-e2e", action="store_true", help="only run the micro-benchmarks")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    page_counts = (1, 5) if args.quick else (1, 5, 30)
+    repeat = 3 if args.quick else 7
+    results = run_micro_benchmarks(page_counts, repeat=repeat)
+    if not args.skip_e2e:
+        results += run_e2e_benchmarks(count=10 if args.quick else 50)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    for result in results:
+        summary = f"{result['median_ms']:.2f} ms" if "median_ms" in result else f"{result['docs_per_s']:.1f} docs/s"
+        print(f"{result['benchmark']} {result['params']}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
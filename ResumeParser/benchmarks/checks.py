@@ -0,0 +1,257 @@
+import io
+import itertools
+import json
+import os
+import sys
+import tempfile
+import zipfile
+import docx2txt
+from bulk_ingest import ingest
+from near_duplicates import NearDuplicateIndex
+from results_store import ResultsStore
+from benchmarks.corpus import generate_corpus, generate_resume, generate_resume_lines, lines_per_page, render_docx, render_pdf, _write_member
+from benchmarks.e2e import _client
+from resume import Resume
+from sections import heading_pattern
+from skill_matcher import skill_matcher
+from text_extraction import iter_docx_pages
+
+_namespaces = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+)
+
+
+# Function to replace or add XML parts of a DOCX rendered by corpus.render_docx
+def _with_parts(docx, parts):
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(docx)) as source, zipfile.ZipFile(output, "w") as target:
+        for name in source.namelist():
+            if name not in parts:
+                _write_member(target, name, source.read(name))
+        for name, xml in parts.items():
+            _write_member(target, name, f'<?xml version="1.0" encoding="UTF-8"?>{xml}')
+    return output.getvalue()
+
+
+def _document(body):
+    return f"<w:document {_namespaces}><w:body>{body}</w:body></w:document>"
+
+
+def _paragraph(*runs):
+    return "<w:p>" + "".join(f"<w:r>{run}</w:r>" for run in runs) + "</w:p>"
+
+
+# DOCX layouts the streaming reader has to read the way docx2txt does
+def docx_parity_cases():
+    lines = generate_resume_lines(0, pages=2)
+    plain = render_docx(lines)
+    table = "".join(
+        "<w:tr>" + "".join(f"<w:tc>{_paragraph(f'<w:t>{cell}</w:t>')}</w:tc>" for cell in row) + "</w:tr>"
+        for row in (("Skills", "Python, SQL"), ("Certifications", "AWS Certified Solutions Architect"))
+    )
+    return {
+        "generated": plain,
+        "generated_long": render_docx(generate_resume_lines(1, pages=40)),
+        "table": _with_parts(plain, {"word/document.xml": _document(_paragraph("<w:t>Jane Doe</w:t>") + f"<w:tbl>{table}</w:tbl>")}),
+        "hyperlink": _with_parts(plain, {"word/document.xml": _document(
+            '<w:p><w:r><w:t xml:space="preserve">Portfolio: </w:t></w:r>'
+            '<w:hyperlink r:id="rId9"><w:r><w:t>github.com/jane</w:t></w:r></w:hyperlink></w:p>'
+        )}),
+        "headers_footers": _with_parts(plain, {
+            "word/header1.xml": f"<w:hdr {_namespaces}>{_paragraph('<w:t>Jane Doe</w:t>')}</w:hdr>",
+            "word/header2.xml": f"<w:hdr {_namespaces}>{_paragraph('<w:t>jane@example.com</w:t>')}</w:hdr>",
+            "word/footer1.xml": f"<w:ftr {_namespaces}>{_paragraph('<w:t>Page 1</w:t>')}</w:ftr>",
+        }),
+        "breaks_and_tabs": _with_parts(plain, {"word/document.xml": _document(
+            _paragraph("<w:t>Skills</w:t><w:cr/><w:t>Python</w:t><w:br/><w:t>SQL</w:t><w:tab/><w:t>Go</w:t>")
+        )}),
+        "nested_text": _with_parts(plain, {"word/document.xml": _document(
+            _paragraph("<w:t>before<w:t>inner</w:t>tail</w:t>", "<w:t>kept<w:x/>dropped</w:t>", "<w:t/>", "<w:t>Café &amp; Bar</w:t>")
+        )}),
+    }
+
+
+# Function to compare the streaming DOCX reader with docx2txt.process; returns the
+# names of the cases where they differ
+def check_docx_parity():
+    return [
+        name for name, content in docx_parity_cases().items()
+        if "".join(iter_docx_pages(content)) != docx2txt.process(io.BytesIO(content))
+    ]
+
+
+# Function to move every heading of a resume to the top of a page, padding the page before
+def _headings_at_page_tops(lines):
+    moved = []
+    for line in lines:
+        if moved and heading_pattern.match(line):
+            moved.extend(["continued"] * (-len(moved) % lines_per_page))
+        moved.append(line)
+    return moved
+
+
+def _extracted(content):
+    resume = Resume(content)
+    return [section.kind for section in resume.sections], resume.certifications, resume.skills
+
+
+# Function to check that PDF pages whose text doesn't end with a line break, as in
+# most real PDFs, are segmented like pages that do, also when a heading starts a
+# page; returns the seeds of the resumes where they differ
+def check_page_boundaries():
+    failures = []
+    for seed in range(10):
+        lines = generate_resume_lines(seed, pages=3)
+        if seed % 2:
+            lines = _headings_at_page_tops(lines)
+        if _extracted(render_pdf(lines, trailing_newline=False)) != _extracted(render_pdf(lines)):
+            failures.append(str(seed))
+    return failures
+
+
+# Text whose letters case-insensitive matching folds differently from str.lower(),
+# and the (keyword, start, end) of every skill the matcher must find in it
+skill_matcher_cases = [
+    ("PYTHON, JAVASCRİPT", {("python", 0, 6), ("javascript", 8, 18)}),
+    ("Lınux/Unıx", {("linux/unix", 0, 10)}),
+    ("Gİt", {("git", 0, 3)}),
+    ("ſql and İnfrastructure as Code", {("sql", 0, 3), ("infrastructure as code", 8, 30)}),
+    ("ſcrum  maſter", {("scrum master", 0, 13), ("scrum", 0, 5)}),
+    ("AWS LAMBDA İ", {("aws lambda", 0, 10), ("aws", 0, 3)}),
+]
+
+
+# Function to run the skill matcher on the case-folding cases; returns the texts it
+# fails on (or raises on) with what it found
+def check_skill_matcher():
+    failures = []
+    taxonomy = skill_matcher.taxonomy
+    for text, expected in skill_matcher_cases:
+        expected = {(taxonomy.skill_id(keyword), start, end) for keyword, start, end in expected}
+        try:
+            found = {(match.skill_id, match.start, match.end) for match in skill_matcher.find_all(text)}
+        except Exception as e:
+            found = repr(e)
+        if found != expected:
+            failures.append(f"{text!r} ({found})")
+    return failures
+
+
+# Function to bulk ingest resumes next to an exact and a near copy of another one,
+# with and without a results store, then again after dropping the end of the
+# checkpoint as an interrupted run would; returns the runs where not exactly one of
+# each pair was marked a duplicate, or where a resume was marked its own duplicate
+def check_bulk_duplicates():
+    corpus = generate_corpus(8, "pdf", seed=3)
+    original = corpus[0][1]
+    corpus[1:1] = [("resume_copy.pdf", original), ("resume_edited.pdf", original + b"\n%edited\n")]
+    failures = []
+    for with_store in (False, True):
+        with tempfile.TemporaryDirectory() as workdir:
+            output_path = os.path.join(workdir, "results.jsonl")
+            checkpoint_path = output_path + ".checkpoint"
+            near_duplicates = NearDuplicateIndex(os.path.join(workdir, "near_duplicates.db"))
+            store = ResultsStore(os.path.join(workdir, "store")) if with_store else None
+            run = "with store" if with_store else "without store"
+            for attempt in ("first run", "interrupted run"):
+                ingest(iter((name, None, content) for name, content in corpus), output_path, checkpoint_path,
+                       workers=2, report_interval=1e9, near_duplicates=near_duplicates, store=store)
+                # A repeated resume's last line is the one that counts
+                with open(output_path, encoding="utf-8") as f:
+                    results = {result["source"]: result for result in map(json.loads, f)}
+                duplicates = sorted(source for source, result in results.items() if "duplicate_of" in result)
+                if len(duplicates) != 2 or not set(duplicates) < {corpus[0][0], "resume_copy.pdf", "resume_edited.pdf"}:
+                    failures.append(f"{run}, {attempt} ({duplicates})")
+                with open(checkpoint_path, encoding="utf-8") as f:
+                    kept = f.readlines()[:4]
+                with open(checkpoint_path, "w", encoding="utf-8") as f:
+                    f.writelines(kept)
+            near_duplicates.close()
+    return failures
+
+
+# Keys of an /analyze/ response (and of a job's result) for each field
+_response_keys = {
+    "name": ("candidate_name",),
+    "skills": ("skills",),
+    "certifications": ("certifications",),
+    "sections": ("sections",),
+    "score": ("score", "common_skills"),
+}
+
+
+def _expected(full, requested):
+    keys = [key for field in requested for key in _response_keys[field]] + ["truncated", "timed_out"]
+    return {key: full[key] for key in keys}
+
+
+# Function to request every subset of the /analyze/ fields on a cold parse cache,
+# then all of them on the cache that left, and to run every subset as a queued job;
+# returns the subsets whose response isn't the matching part of the full response
+def check_analysis_fields():
+    content = generate_resume(0, "pdf")
+    job_description = "Python, Docker, Kubernetes, SQL, AWS and machine learning"
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        client = _client(workdir)
+        import api
+        from job_queue import JobQueue, process_job
+        from parse_cache import ParseCache
+
+        def analyze(requested):
+            response = client.post(
+                "/analyze/",
+                params={"fields": ",".join(requested)},
+                data={"job_description": job_description},
+                files={"file": ("resume.pdf", content, "application/pdf")},
+            )
+            return response.json() if response.status_code == 200 else None
+
+        queue = JobQueue(os.path.join(workdir, "check_jobs.db"))
+
+        def run_job(requested):
+            job = {"job_id": "-".join(requested), "fields": list(requested), "job_description": job_description}
+            with open(queue.document_path(job["job_id"]), "wb") as f:
+                f.write(content)
+            try:
+                return process_job(queue, job)
+            except Exception:
+                return None
+
+        fields = list(api.analysis_fields)
+        api.parse_cache = ParseCache()
+        full = analyze(fields)
+        full_job = run_job(fields)
+        if full is None or full_job is None:
+            return ["all fields"]
+        for size in range(1, len(fields)):
+            for requested in itertools.combinations(fields, size):
+                api.parse_cache = ParseCache()
+                if analyze(requested) != _expected(full, requested):
+                    failures.append(f"analyze {','.join(requested)}")
+                elif analyze(fields) != full:
+                    failures.append(f"analyze all after {','.join(requested)}")
+                result = run_job(requested)
+                if result is None or result != _expected(full_job, requested):
+                    failures.append(f"job {','.join(requested)}")
+        queue.close()
+    return failures
+
+
+# Function to run every check and exit non-zero if one fails
+def main():
+    failures = {
+        "docx_parity": check_docx_parity(),
+        "page_boundaries": check_page_boundaries(),
+        "skill_matcher": check_skill_matcher(),
+        "bulk_duplicates": check_bulk_duplicates(),
+        "analysis_fields": check_analysis_fields(),
+    }
+    for check, failed in failures.items():
+        print(f"{check}: {'failed: ' + ', '.join(failed) if failed else 'ok'}")
+    sys.exit(1 if any(failures.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
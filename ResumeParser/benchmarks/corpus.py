@@ -0,0 +1,160 @@
+import io
+import random
+import zipfile
+from xml.sax.saxutils import escape
+from skills_keywords import skills_keywords
+
+first_names = ["John", "Priya", "Maria", "Wei", "Ahmed", "Olga", "James", "Aisha", "Carlos", "Yuki"]
+last_names = ["Smith", "Sharma", "Garcia", "Chen", "Hassan", "Ivanova", "Brown", "Okafor", "Silva", "Tanaka"]
+filler_words = [
+    "delivered", "designed", "improved", "team", "project", "customers", "platform", "reduced",
+    "latency", "built", "owned", "services", "migrated", "reporting", "stakeholders", "quality",
+    "features", "release", "internal", "tooling", "across", "multiple", "regions", "using",
+]
+certifications = [
+    "AWS Certified Solutions Architect", "Certified Kubernetes Administrator", "Certified ScrumMaster",
+    "Oracle Certified Professional", "Google Professional Data Engineer", "PMP",
+]
+hobbies = ["Chess", "Hiking", "Photography", "Open source", "Cycling", "Cooking"]
+
+default_layout = ("contact", "summary", "experience", "education", "skills", "certifications", "hobbies")
+lines_per_page = 48
+
+
+# Function to make one sentence where roughly skill_density of the words are skills
+def _sentence(rng, skill_density, words=14):
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(skills_keywords) if rng.random() < skill_density else rng.choice(filler_words))
+    return " ".join(parts).capitalize() + "."
+
+
+# Function to generate the text lines of a synthetic resume. The same seed and
+# parameters always give the same resume; the experience section grows until
+# the resume fills the requested number of pages.
+def generate_resume_lines(seed, pages=2, skill_density=0.1, layout=default_layout):
+    rng = random.Random(seed)
+    name = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+    other_lines = 0
+    sections = {}
+
+    sections["contact"] = [name, f"{name.split()[0].lower()}@example.com", "+1 555 0100"]
+    sections["summary"] = ["SUMMARY"] + [_sentence(rng, skill_density) for _ in range(3)]
+    sections["education"] = ["EDUCATION", "BSc Computer Science, State University, 2015"]
+    sections["skills"] = ["Skills", ", ".join(rng.sample(skills_keywords, 12))]
+    sections["certifications"] = ["CERTIFICATES"] + rng.sample(certifications, 3)
+    sections["hobbies"] = ["HOBBIES AND INTERESTS", ", ".join(rng.sample(hobbies, 3))]
+    for section in layout:
+        if section != "experience":
+            other_lines += len(sections[section])
+
+    experience_lines = max(pages * lines_per_page - other_lines - 1, 1)
+    sections["experience"] = ["EXPERIENCE"] + [_sentence(rng, skill_density) for _ in range(experience_lines)]
+
+    lines = []
+    for section in layout:
+        lines.extend(sections[section])
+    return lines
+
+
+# Function to render text lines as a PDF with lines_per_page lines on each page.
+# Without trailing_newline the last line of a page isn't followed by a line move,
+# so its extracted text doesn't end with "\n", as in most real PDFs.
+def render_pdf(lines, trailing_newline=True):
+    page_lines = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for lines_on_page in page_lines:
+        text = " T* ".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj"
+            for line in lines_on_page
+        )
+        if trailing_newline:
+            text += " T*"
+        stream = f"BT /F1 10 Tf 15 TL 40 760 Td {text} ET".encode("latin-1", "replace")
+        kids.append(f"{len(objects) + 1} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {len(objects) + 2} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref = output.tell()
+    output.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        output.write(f"{offset:010d} 00000 n \n".encode())
+    output.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return output.getvalue()
+
+
+# Write a zip member with a fixed timestamp so the same input gives the same bytes
+def _write_member(archive, name, data):
+    member = zipfile.ZipInfo(name, date_time=(2020, 1, 1, 0, 0, 0))
+    member.compress_type = zipfile.ZIP_DEFLATED
+    archive.writestr(member, data)
+
+
+# Function to render text lines as a DOCX with one paragraph per line
+def render_docx(lines, image_bytes=0):
+    namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    paragraphs = "".join(f"<w:p><w:r><w:t>{escape(line)}</w:t></w:r></w:p>" for line in lines)
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as docx:
+        _write_member(
+            docx,
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>',
+        )
+        _write_member(
+            docx,
+            "_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="word/document.xml"/></Relationships>',
+        )
+        _write_member(
+            docx,
+            "word/document.xml",
+            f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{namespace}"><w:body>{paragraphs}</w:body></w:document>',
+        )
+        if image_bytes:
+            # Stand-in for an embedded photo or logo; random bytes don't compress
+            _write_member(docx, "word/media/image1.png", random.Random(len(lines)).randbytes(image_bytes))
+    return output.getvalue()
+
+
+# Function to generate a synthetic resume file; file_type is "pdf" or "docx"
+def generate_resume(seed, file_type="pdf", pages=2, skill_density=0.1, layout=default_layout, image_bytes=0, trailing_newline=True):
+    lines = generate_resume_lines(seed, pages, skill_density, layout)
+    if file_type == "pdf":
+        return render_pdf(lines, trailing_newline)
+    if file_type == "docx":
+        return render_docx(lines, image_bytes)
+    raise ValueError(f"Unknown file type {file_type!r}")
+
+
+# Function to generate a corpus of (filename, content) resumes
+def generate_corpus(count, file_type="pdf", pages=2, skill_density=0.1, layout=default_layout, seed=0, trailing_newline=True):
+    return [
+        (f"resume_{seed + i:05d}.{file_type}", generate_resume(seed + i, file_type, pages, skill_density, layout, trailing_newline=trailing_newline))
+        for i in range(count)
+    ]
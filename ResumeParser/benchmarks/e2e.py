@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+from benchmarks.corpus import generate_corpus
+
+
+# Function to create the API test client. Every file the app writes (candidate index,
+# job queue and its documents, near-duplicate index) goes to workdir, and no job
+# workers are started. The app reads these settings when it is first imported.
+def _client(workdir):
+    os.environ["SKILL_INDEX_PATH"] = os.path.join(workdir, "skill_index.db")
+    os.environ["JOB_QUEUE_PATH"] = os.path.join(workdir, "jobs.db")
+    os.environ["NEAR_DUPLICATE_INDEX_PATH"] = os.path.join(workdir, "near_duplicates.db")
+    os.environ["JOB_WORKERS"] = "0"
+    from fastapi.testclient import TestClient
+    import api
+    return TestClient(api.app)
+
+
+# Function to make a request and fail on an error response, so errors aren't timed as throughput
+def _post(client, url, **kwargs):
+    response = client.post(url, **kwargs)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url} returned {response.status_code}: {response.text}")
+    return response
+
+
+def _throughput(name, params, count, elapsed):
+    return {
+        "benchmark": name,
+        "params": params,
+        "documents": count,
+        "seconds": elapsed,
+        "docs_per_s": count / elapsed if elapsed else None,
+    }
+
+
+# Function to measure documents per second through the FastAPI app: the upload plus
+# three extraction endpoints for each resume, and one /analyze_batch/ call for all of them
+def run_e2e_benchmarks(count=20, pages=2, skill_density=0.1):
+    params = {"count": count, "pages": pages, "skill_density": skill_density}
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        client = _client(workdir)
+        with client:
+            corpus = generate_corpus(count, "pdf", pages=pages, skill_density=skill_density, seed=1000)
+            start = time.perf_counter()
+            for filename, content in corpus:
+                response = _post(client, "/upload_resume/", files={"file": (filename, content, "application/pdf")})
+                document_id = response.json()["document_id"]
+                for endpoint in ("/extract_candidate_name/", "/extract_candidate_skills/", "/extract_certifications_hobbies_interests/"):
+                    _post(client, endpoint, params={"document_id": document_id})
+            results.append(_throughput("e2e/upload_and_extract", params, count, time.perf_counter() - start))
+
+            corpus = generate_corpus(count, "pdf", pages=pages, skill_density=skill_density, seed=2000)
+            start = time.perf_counter()
+            _post(
+                client,
+                "/analyze_batch/",
+                files=[("files", (filename, content, "application/pdf")) for filename, content in corpus],
+                data={"job_description": "Python, Docker, Kubernetes, SQL, AWS and machine learning"},
+            )
+            results.append(_throughput("e2e/analyze_batch", params, count, time.perf_counter() - start))
+    return results
@@ -0,0 +1,51 @@
+import io
+import re
+import docx2txt
+from benchmarks.corpus import generate_resume
+from benchmarks.timing import time_call
+from skills_keywords import skills_keywords
+from text_extraction import iter_pdf_pages, iter_docx_pages
+from extractors import find_candidate_name, find_skills, find_certifications
+from skill_matcher import skill_matcher
+
+
+# The per-keyword loop the extractors used before the compiled matcher, kept as a baseline
+def legacy_skills(text):
+    return [skill for skill in skills_keywords if re.search(rf'\b{re.escape(skill)}\b', text, re.IGNORECASE)]
+
+
+# The certification regex from api.py, kept as a baseline
+def legacy_certifications(text):
+    return re.search(r'(?i)CERTIFICATES[\s\S]*?(?=Skills|$)', text, re.IGNORECASE | re.DOTALL)
+
+
+# The docx2txt call text extraction used before the streaming DOCX reader, kept as a baseline
+def legacy_docx_text(content):
+    return docx2txt.process(io.BytesIO(content))
+
+
+# Function to time every extraction stage on synthetic resumes of each page count.
+# extract_candidate_skills is the whole stage, which reads only the skills section;
+# the matcher is compared with the legacy loop on the same whole text (match_skills).
+def run_micro_benchmarks(page_counts=(1, 5, 30), skill_density=0.1, repeat=5):
+    results = []
+    for pages in page_counts:
+        pdf = generate_resume(pages, "pdf", pages=pages, skill_density=skill_density)
+        docx = generate_resume(pages, "docx", pages=pages, skill_density=skill_density)
+        text = "".join(iter_pdf_pages(pdf))
+        params = {"pages": pages, "skill_density": skill_density, "chars": len(text)}
+
+        stages = {
+            "extract_text_from_pdf": lambda: "".join(iter_pdf_pages(pdf)),
+            "extract_text_from_docx": lambda: "".join(iter_docx_pages(docx)),
+            "extract_text_from_docx_legacy": lambda: legacy_docx_text(docx),
+            "extract_candidate_name": lambda: find_candidate_name([text]),
+            "extract_candidate_skills": lambda: find_skills([text]),
+            "match_skills": lambda: skill_matcher.match_keywords(text),
+            "match_skills_legacy": lambda: legacy_skills(text),
+            "extract_certifications": lambda: find_certifications([text]),
+            "extract_certifications_legacy": lambda: legacy_certifications(text),
+        }
+        for stage, fn in stages.items():
+            results.append({"benchmark": f"micro/{stage}", "params": params, **time_call(fn, repeat)})
+    return results
@@ -0,0 +1,19 @@
+import statistics
+import time
+
+
+# Function to time fn() repeat times and summarize the run times in milliseconds
+def time_call(fn, repeat=5, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "repeat": repeat,
+    }
@@ -0,0 +1,94 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Limits on the work spent on one document. Extraction checks the budget between
+# pages (and between DOCX paragraphs) and stops early once it runs out, so the
+# fields come from the text read so far. Page and character limits cut the same
+# place every time and set truncated; the time limit depends on load and sets
+# timed_out. Time is the wall-clock time spent extracting, so a document decoded
+# lazily over several requests isn't charged for the gaps in between. A page that
+# is slow to decode can't be interrupted; the worker pool timeout stays the hard
+# limit for that. A budget with no limits set never runs out.
+class ExtractionBudget:
+    def __init__(self, max_pages=None, max_chars=None, max_seconds=None):
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.max_seconds = max_seconds
+        self.seconds = 0.0
+        self.pages = 0
+        self.chars = 0
+        self.truncated = False
+        self.timed_out = False
+
+    # Function to get a fresh copy of this budget with nothing spent
+    def start(self):
+        return ExtractionBudget(self.max_pages, self.max_chars, self.max_seconds)
+
+    # Function to charge extraction time to the budget
+    def charge(self, seconds):
+        self.seconds += seconds
+
+    # Function to charge the time a block of extraction code takes
+    @contextmanager
+    def spending(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.charge(time.perf_counter() - started)
+
+    # Function to check whether another page (or DOCX paragraph) may be read
+    def allows_more(self):
+        if self.truncated or self.timed_out:
+            return False
+        if self.max_pages is not None and self.pages >= self.max_pages:
+            self.truncated = True
+            return False
+        if self.max_chars is not None and self.chars >= self.max_chars:
+            self.truncated = True
+            return False
+        if self.max_seconds is not None and self.seconds >= self.max_seconds:
+            self.timed_out = True
+            return False
+        return True
+
+    # Function to account for a piece of text, cut to what is left of the character budget
+    def take_text(self, text):
+        if self.max_chars is not None and self.chars + len(text) > self.max_chars:
+            text = text[:self.max_chars - self.chars]
+            self.truncated = True
+        self.chars += len(text)
+        return text
+
+    def flags(self):
+        return {"truncated": self.truncated, "timed_out": self.timed_out}
+
+
+# Budget used when none is given; 0 in DOCUMENT_MAX_PAGES, DOCUMENT_MAX_CHARS or
+# DOCUMENT_MAX_SECONDS turns that limit off
+default_budget = ExtractionBudget(
+    max_pages=int(os.environ.get("DOCUMENT_MAX_PAGES", 100)) or None,
+    max_chars=int(os.environ.get("DOCUMENT_MAX_CHARS", 500000)) or None,
+    max_seconds=float(os.environ.get("DOCUMENT_MAX_SECONDS", 20)) or None,
+)
+
+_current_budget = ContextVar("current_budget", default=None)
+
+
+# Function to get the budget of the document being extracted in this context, if any
+def current_budget():
+    return _current_budget.get()
+
+
+# Function to run fn(*args) with a fresh copy of budget applied to every document it
+# extracts; returns fn's result and the budget's truncated/timed_out flags
+def run_budgeted(budget, fn, *args):
+    budget = (budget or default_budget).start()
+    token = _current_budget.set(budget)
+    try:
+        return fn(*args), budget.flags()
+    finally:
+        _current_budget.reset(token)
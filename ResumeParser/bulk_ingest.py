@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import sys
+import tarfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from parse_cache import document_hash
+from resume import Resume
+from near_duplicates import NearDuplicateIndex, default_threshold
+from scoring import normalize_skills
+from skill_index import SkillIndex
+from results_store import ResultsStore
+from sections import sections_to_dicts
+import metrics
+
+supported_extensions = (".pdf", ".docx")
+
+# With a results store, results are written out this many at a time, each batch a segment
+store_batch_size = 256
+
+
+# Function to get the file type used in the failure report
+def file_type_of(name):
+    return os.path.splitext(name)[1].lower().lstrip(".") or "unknown"
+
+
+# Function to yield (source_id, path, content) for every resume in a directory;
+# the content is read by the worker so the parent never holds it
+def iter_directory(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(supported_extensions):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, directory), path, None
+
+
+# Function to yield (source_id, path, content) for every resume in a tarball
+def iter_tarball(tarball_path):
+    with tarfile.open(tarball_path, "r:*") as tar:
+        for member in tar:
+            if member.isfile() and member.name.lower().endswith(supported_extensions):
+                yield member.name, None, tar.extractfile(member).read()
+
+
+# Fields a near-duplicate reuses from the resume it nearly matches
+reused_fields = ("candidate_name", "skills", "certifications", "sections")
+
+
+# Near-duplicate indexes this worker process has opened, by (path, threshold)
+_near_duplicate_indexes = {}
+
+
+def _near_duplicate_index(near_duplicates):
+    if near_duplicates not in _near_duplicate_indexes:
+        _near_duplicate_indexes[near_duplicates] = NearDuplicateIndex(*near_duplicates)
+    return _near_duplicate_indexes[near_duplicates]
+
+
+# Function to mark a result as a near-duplicate of an indexed resume, reusing its fields
+def reuse_fields(result, match):
+    result.update((field, match["fields"][field]) for field in reused_fields)
+    result["duplicate_of"] = match["document_id"]
+    result["similarity"] = match["similarity"]
+    return result
+
+
+# Function to run the name/skills/certification extraction on one resume. With a
+# near-duplicate index, given as (path, threshold), a resume that nearly matches
+# one indexed by the time the worker looks reuses its fields and is marked with
+# duplicate_of (that resume's document hash). That spares extracting it again; any
+# other carries its signature as "fingerprint" so the caller can make the final
+# decision against what was indexed since.
+def process_document(source_id, path, content, near_duplicates=None):
+    file_type = file_type_of(source_id)
+    try:
+        if content is None:
+            with open(path, "rb") as f:
+                content = f.read()
+        resume = Resume(content)
+        result = {"source": source_id, "file_type": file_type, "document_hash": document_hash(content)}
+        if near_duplicates is not None:
+            # A rerun finds each resume indexed under its own hash; that isn't a duplicate
+            match = _near_duplicate_index(near_duplicates).find(resume.fingerprint, exclude=result["document_hash"])
+            if match is not None and match["fields"] is not None:
+                return reuse_fields(result, match)
+        result["candidate_name"] = resume.name
+        result["skills"] = resume.skills
+        result["certifications"] = resume.certifications
+        result["sections"] = sections_to_dicts(resume.sections)
+        if near_duplicates is not None and resume.fingerprint is not None:
+            result["fingerprint"] = resume.fingerprint.tolist()
+        return result
+    except Exception as e:
+        return {"source": source_id, "file_type": file_type, "error": str(e)}
+
+
+# Function to read the IDs of the resumes an earlier run already wrote out
+def load_checkpoint(checkpoint_path):
+    try:
+        with open(checkpoint_path, encoding="utf-8") as f:
+            return set(line.rstrip("\n") for line in f if line.strip())
+    except FileNotFoundError:
+        return set()
+
+
+# Prints throughput and per file type failures to stderr while the run goes on
+class ProgressReporter:
+    def __init__(self, interval):
+        self.interval = interval
+        self.started = time.time()
+        self.last_report = self.started
+        self.processed = 0
+        self.failures = Counter()
+
+    def record(self, result):
+        self.processed += 1
+        if "error" in result:
+            self.failures[result["file_type"]] += 1
+        if time.time() - self.last_report >= self.interval:
+            self.report()
+
+    def report(self):
+        self.last_report = time.time()
+        elapsed = max(self.last_report - self.started, 1e-9)
+        failures = ", ".join(f"{file_type}={count}" for file_type, count in sorted(self.failures.items())) or "none"
+        print(
+            f"processed {self.processed} documents, {self.processed / elapsed:.1f} docs/s, failures: {failures}",
+            file=sys.stderr,
+        )
+
+    # Function to print the mean time each stage took per call
+    def report_stages(self):
+        with metrics.registry.lock:
+            stages = sorted(metrics.registry.stage_durations.items())
+        for stage, histogram in stages:
+            mean_ms = histogram.sum / histogram.count * 1000 if histogram.count else 0.0
+            print(f"  {stage}: {histogram.count} calls, {mean_ms:.2f} ms mean", file=sys.stderr)
+
+
+# Function to process every resume not yet in the checkpoint, appending results to the output.
+# A result is written to the near-duplicate index as soon as it arrives, and to the
+# skill index, the store and then the output before its checkpoint line, so an
+# interrupted run may at worst repeat the documents that were in flight or waiting
+# for their batch (see below). Repeating them adds no output lines twice; index
+# entries are replaced, and store rows superseded.
+# When an index is given, each successfully processed resume is also added to it,
+# keyed by its document hash. When a near-duplicate index is given, resumes that
+# nearly match one already in it, or are a copy of another source's resume, reuse
+# that one's results and are left out of the skill index; the others are added to
+# it. That is decided here as results arrive, so of resumes in flight together the
+# one that finishes first is the original. When a results store is given, the
+# resumes that are not near-duplicates are appended to it with their source as
+# candidate ID, and all results are written out in batches of store_batch_size.
+def ingest(sources, output_path, checkpoint_path, workers=None, report_interval=5.0, index=None, near_duplicates=None, store=None):
+    done = load_checkpoint(checkpoint_path)
+    reporter = ProgressReporter(report_interval)
+    max_in_flight = (workers or os.cpu_count() or 1) * 4
+
+    with open(output_path, "a", encoding="utf-8") as output, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+
+        # Function to write results everywhere they go, then checkpoint them
+        def commit(results):
+            extracted = [result for result in results if "error" not in result and "duplicate_of" not in result]
+            if index is not None:
+                index.add_candidates([
+                    (result["document_hash"], normalize_skills(result["skills"]), result["candidate_name"])
+                    for result in extracted
+                ])
+            if store is not None:
+                store.append(
+                    {
+                        "candidate_id": result["source"],
+                        "candidate_name": result["candidate_name"],
+                        "skills": normalize_skills(result["skills"]),
+                        "sections": result["sections"],
+                        "document_hash": result["document_hash"],
+                    }
+                    for result in extracted
+                )
+            for result in results:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            for result in results:
+                checkpoint.write(result["source"] + "\n")
+            checkpoint.flush()
+
+        batch = []
+
+        # Function to compare a result its worker extracted with the resumes indexed
+        # since the worker looked; one that isn't a near-duplicate is indexed right
+        # away, not with its batch, so every result after it is compared with it.
+        # A rerun finds each resume indexed under its own hash; that is only a
+        # duplicate when another source's copy was indexed there.
+        def deduplicate(result):
+            fingerprint = result.pop("fingerprint")
+            document_hash = result["document_hash"]
+            fields = near_duplicates.indexed_fields(document_hash)
+            if fields is not None and fields.get("source", result["source"]) != result["source"]:
+                match = {"document_id": document_hash, "similarity": 1.0, "fields": fields}
+            else:
+                match = near_duplicates.find(fingerprint, exclude=document_hash)
+            if match is not None and match["fields"] is not None:
+                reuse_fields(result, match)
+            else:
+                fields = {field: result[field] for field in reused_fields}
+                near_duplicates.add(document_hash, fingerprint, dict(fields, source=result["source"]))
+
+        def write_results(finished):
+            for future in finished:
+                result, spans, counts = future.result()
+                metrics.merge_recorded(spans, counts)
+                if "fingerprint" in result:
+                    deduplicate(result)
+                batch.append(result)
+                reporter.record(result)
+            if store is None or len(batch) >= store_batch_size:
+                commit(batch)
+                batch.clear()
+
+        # Workers open their own connection to the near-duplicate index
+        dedupe = (near_duplicates.path, near_duplicates.threshold) if near_duplicates is not None else None
+        in_flight = set()
+        for source_id, path, content in sources:
+            if source_id in done:
+                continue
+            # Keep a bounded number of documents queued so tarball contents aren't all held in memory
+            if len(in_flight) >= max_in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                write_results(finished)
+            in_flight.add(executor.submit(metrics.run_recorded, process_document, source_id, path, content, dedupe))
+
+        write_results(wait(in_flight).done)
+        commit(batch)
+
+    reporter.report()
+    reporter.report_stages()
+    return reporter
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract name, skills and certifications from a directory or tarball of PDF/DOCX resumes into JSONL.")
+    parser.add_argument("source", help="directory or tarball (.tar, .tar.gz, ...) of resumes")
+    parser.add_argument("output", help="JSONL file that results are appended to")
+    parser.add_argument("--checkpoint", help="file of already processed resumes (default: OUTPUT.checkpoint)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--index", help="also add the resumes to this candidate skill index (SQLite file)")
+    parser.add_argument("--near-duplicates", help="reuse the results of resumes nearly identical to one in this near-duplicate index (SQLite file), and add the others to it")
+    parser.add_argument("--similarity-threshold", type=float, default=default_threshold, help=f"share of shingles two resumes must have in common to count as near-duplicates (default {default_threshold})")
+    parser.add_argument("--store", help="also append the results to this columnar results store (directory)")
+    parser.add_argument("--compact", action="store_true", help="merge the results store into one segment when done (it is otherwise only compacted when it has too many segments)")
+    parser.add_argument("--metrics-file", help="write stage timings and counters here in Prometheus text format when done")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="seconds between progress reports")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.source):
+        sources = iter_directory(args.source)
+    elif tarfile.is_tarfile(args.source):
+        sources = iter_tarball(args.source)
+    else:
+        parser.error(f"{args.source} is neither a directory nor a tarball")
+
+    index = SkillIndex(args.index) if args.index else None
+    near_duplicates = NearDuplicateIndex(args.near_duplicates, args.similarity_threshold) if args.near_duplicates else None
+    store = ResultsStore(args.store) if args.store else None
+    if args.compact and store is None:
+        parser.error("--compact needs --store")
+    try:
+        ingest(
+            sources,
+            args.output,
+            args.checkpoint or args.output + ".checkpoint",
+            workers=args.workers,
+            report_interval=args.report_interval,
+            index=index,
+            near_duplicates=near_duplicates,
+            store=store,
+        )
+        if args.compact:
+            store.compact()
+    finally:
+        if index is not None:
+            index.close()
+        if near_duplicates is not None:
+            near_duplicates.close()
+
+    if args.metrics_file:
+        with open(args.metrics_file, "w", encoding="utf-8") as f:
+            f.write(metrics.registry.render_prometheus())
+
+
+if __name__ == "__main__":
+    main()
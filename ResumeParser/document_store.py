@@ -0,0 +1,244 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+# Function to generate a new document ID
+def new_document_id():
+    return uuid.uuid4().hex
+
+
+# Function to check that a client-supplied ID is one we could have generated
+def is_valid_document_id(document_id):
+    return bool(re.fullmatch(r'[0-9a-f]{32}', document_id or ""))
+
+
+# Keeps documents in this process, evicting the least recently used ones
+class MemoryBackend:
+    def __init__(self):
+        self.records = OrderedDict()
+        self.lock = threading.RLock()
+
+    def put(self, document_id, content, sha256):
+        with self.lock:
+            self.records[document_id] = {"content": content, "sha256": sha256, "pages": None, "accessed": time.time()}
+
+    # Memory is where this backend keeps documents, so a spooled upload is read in
+    def put_upload(self, document_id, upload):
+        self.put(document_id, upload.read_bytes(), upload.sha256)
+
+    # Documents only live in memory, so there is no file to hand out
+    def get_path(self, document_id, max_age):
+        return None
+
+    def get_content(self, document_id, max_age):
+        with self.lock:
+            record = self.records.get(document_id)
+            if record is None:
+                return None
+            if time.time() - record["accessed"] > max_age:
+                del self.records[document_id]
+                return None
+            record["accessed"] = time.time()
+            self.records.move_to_end(document_id)
+            return record["content"]
+
+    def get_sha256(self, document_id):
+        with self.lock:
+            record = self.records.get(document_id)
+            return record["sha256"] if record else None
+
+    def get_pages(self, document_id):
+        with self.lock:
+            record = self.records.get(document_id)
+            return record["pages"] if record else None
+
+    def put_pages(self, document_id, pages):
+        with self.lock:
+            record = self.records.get(document_id)
+            if record is not None:
+                record["pages"] = pages
+
+    def delete(self, document_id):
+        with self.lock:
+            self.records.pop(document_id, None)
+
+    # Documents from least to most recently used, with their last access time and size
+    def entries(self):
+        with self.lock:
+            return [
+                (document_id, record["accessed"], _record_size(record))
+                for document_id, record in self.records.items()
+            ]
+
+
+def _record_size(record):
+    size = len(record["content"])
+    if record["pages"]:
+        size += sum(len(page.encode("utf-8")) for page in record["pages"])
+    return size
+
+
+# Keeps documents in a local directory so several uvicorn workers can share them.
+# The file modification time doubles as the last access time.
+class FileBackend:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, document_id, suffix):
+        return os.path.join(self.directory, document_id + suffix)
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # The spool file is moved into the directory rather than read into memory. Its
+    # hash is written first, so every stored document has one.
+    def put_upload(self, document_id, upload):
+        self._write(self._path(document_id, ".sha256"), upload.sha256.encode("ascii"))
+        upload.move_to(self._path(document_id, ".bin"))
+
+    # Function to get the path of a stored document, so it can be parsed in place
+    def get_path(self, document_id, max_age):
+        path = self._path(document_id, ".bin")
+        try:
+            if time.time() - os.stat(path).st_mtime > max_age:
+                self.delete(document_id)
+                return None
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            return None
+
+    def get_content(self, document_id, max_age):
+        path = self._path(document_id, ".bin")
+        try:
+            if time.time() - os.stat(path).st_mtime > max_age:
+                self.delete(document_id)
+                return None
+            with open(path, "rb") as f:
+                content = f.read()
+            os.utime(path)
+            return content
+        except FileNotFoundError:
+            return None
+
+    def get_sha256(self, document_id):
+        try:
+            with open(self._path(document_id, ".sha256"), encoding="ascii") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get_pages(self, document_id):
+        try:
+            with open(self._path(document_id, ".pages.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_pages(self, document_id, pages):
+        if os.path.exists(self._path(document_id, ".bin")):
+            self._write(self._path(document_id, ".pages.json"), json.dumps(pages).encode("utf-8"))
+
+    def delete(self, document_id):
+        for suffix in (".bin", ".pages.json", ".sha256"):
+            try:
+                os.remove(self._path(document_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".bin"):
+                continue
+            document_id = name[:-len(".bin")]
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            size = stat.st_size
+            try:
+                size += os.stat(self._path(document_id, ".pages.json")).st_size
+            except FileNotFoundError:
+                pass
+            entries.append((document_id, stat.st_mtime, size))
+        entries.sort(key=lambda entry: entry[1])
+        return entries
+
+
+# Uploaded documents addressed by ID, expired after ttl_seconds without use
+# and evicted oldest-first once they take more than max_bytes
+class DocumentStore:
+    def __init__(self, backend=None, ttl_seconds=3600, max_bytes=256 * 1024 * 1024):
+        self.backend = backend or MemoryBackend()
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    # Function to store a spooled upload (see uploads.py) and return its ID
+    def add_upload(self, upload):
+        document_id = new_document_id()
+        self.backend.put_upload(document_id, upload)
+        self.evict()
+        return document_id
+
+    # Function to get the path of a document file, for backends that keep documents
+    # on disk; None if unknown, expired, or only kept in memory
+    def get_path(self, document_id):
+        if not is_valid_document_id(document_id):
+            return None
+        return self.backend.get_path(document_id, self.ttl_seconds)
+
+    # Function to get the raw bytes of a document; None if unknown or expired
+    def get_content(self, document_id):
+        if not is_valid_document_id(document_id):
+            return None
+        return self.backend.get_content(document_id, self.ttl_seconds)
+
+    # Function to get the SHA-256 of a document, taken when it was uploaded (the parse
+    # cache key); None if unknown. Callers look the document up first, as for get_pages.
+    def get_sha256(self, document_id):
+        if not is_valid_document_id(document_id):
+            return None
+        return self.backend.get_sha256(document_id)
+
+    # Function to get the page texts kept alongside a document; None if they haven't
+    # been extracted. Callers look the document up first, which is what applies the TTL.
+    def get_pages(self, document_id):
+        if not is_valid_document_id(document_id):
+            return None
+        return self.backend.get_pages(document_id)
+
+    # Function to keep the extracted page texts alongside the document
+    def put_pages(self, document_id, pages):
+        self.backend.put_pages(document_id, pages)
+        self.evict()
+
+    def delete(self, document_id):
+        self.backend.delete(document_id)
+
+    # Function to drop expired documents and trim the store to its byte budget
+    def evict(self):
+        now = time.time()
+        total_bytes = 0
+        live = []
+        for document_id, accessed, size in self.backend.entries():
+            if now - accessed > self.ttl_seconds:
+                self.backend.delete(document_id)
+            else:
+                live.append((document_id, size))
+                total_bytes += size
+
+        for document_id, size in live:
+            if total_bytes <= self.max_bytes:
+                break
+            self.backend.delete(document_id)
+            total_bytes -= size
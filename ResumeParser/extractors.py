@@ -0,0 +1,90 @@
+from resume import Resume
+from scoring import calculate_matching_score
+from sections import sections_to_dicts
+from text_extraction import open_document
+from budgets import run_budgeted
+
+
+# Function to find the candidate's name on the first page; later pages are never read
+def find_candidate_name(pages):
+    return Resume(pages=pages).name
+
+
+# Function to find the skills in the resume's skills section
+def find_skills(pages):
+    return Resume(pages=pages).skills
+
+
+# Function to find the certifications, hobbies, and interests. Pages are read only
+# until a heading closes that part of the resume.
+def find_certifications(pages):
+    return Resume(pages=pages).certifications
+
+
+# Function to compute the MinHash signature of the resume's text (see near_duplicates.py),
+# as a list so it can be cached with the other fields
+def find_fingerprint(pages):
+    fingerprint = Resume(pages=pages).fingerprint
+    return fingerprint.tolist() if fingerprint is not None else None
+
+
+# Function to find the candidate's name, decoding only the first page of the document
+def find_candidate_name_in_document(content):
+    return Resume(content).name
+
+
+# Function to find the certifications, decoding pages only until the section ends
+def find_certifications_in_document(content):
+    return Resume(content).certifications
+
+
+# Function to extract a resume's name and skills and score it against the job's skills.
+# The result also carries the resume's fingerprint, for collapsing near-duplicates.
+def analyze_resume(filename, content, job_skills):
+    try:
+        resume = Resume(content)
+        candidate_skills = resume.normalized_skills
+        score, common_skills = calculate_matching_score(candidate_skills, job_skills)
+        return {
+            "filename": filename,
+            "candidate_name": resume.name,
+            "skills": candidate_skills,
+            "common_skills": common_skills,
+            "score": score,
+            "fingerprint": resume.fingerprint,
+        }
+    except Exception as e:
+        return {"filename": filename, "error": str(e)}
+
+
+# Function to analyze a chunk of (filename, path) resumes in one worker call, each
+# parsed from a memory-mapped view of its file within its own budget
+def analyze_resumes(resumes, job_skills, budget=None):
+    results = []
+    for filename, path in resumes:
+        with open_document(path) as content:
+            result, flags = run_budgeted(budget, analyze_resume, filename, content, job_skills)
+        if "error" not in result:
+            result.update(flags)
+        results.append(result)
+    return results
+
+
+# Function to compute the requested fields ("name", "skills", "certifications",
+# "sections") from one parse of the document (see resume.Resume). Name and
+# certifications alone only decode the pages they need. Pass the cached page texts
+# as pages to skip decoding entirely. Returns the fields and, if every page ended up
+# decoded, the page texts so the caller can cache them.
+def analyze_document(content, fields, pages=None):
+    resume = Resume(content, pages)
+    result = {}
+    if "name" in fields:
+        result["candidate_name"] = resume.name
+    # The score is computed from the normalized skills
+    if "skills" in fields or "score" in fields:
+        result["normalized_skills"] = resume.normalized_skills
+    if "certifications" in fields:
+        result["certifications"] = resume.certifications
+    if "sections" in fields:
+        result["sections"] = sections_to_dicts(resume.sections)
+    return result, resume.pages.pages if resume.pages.complete else None
@@ -0,0 +1,256 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import threading
+import time
+import uuid
+from extractors import analyze_document
+from scoring import extract_normalized_skills, calculate_matching_score
+from text_extraction import call_with_document
+from budgets import run_budgeted
+
+# Errors worth another attempt: the document itself may be fine
+transient_errors = (OSError, MemoryError, TimeoutError)
+
+
+# Durable queue of resume extraction jobs and their results, kept in SQLite so
+# that any process (API workers, job workers, a restarted server) sees the same
+# jobs. A claimed job carries a lease; if its worker dies, the job becomes
+# claimable again once the lease runs out.
+class JobQueue:
+    def __init__(self, path, documents_dir=None, max_attempts=3, lease_seconds=300):
+        self.path = path
+        self.documents_dir = documents_dir or os.path.splitext(path)[0] + "_documents"
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        os.makedirs(self.documents_dir, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                filename TEXT,
+                fields TEXT NOT NULL,
+                job_description TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_until REAL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, available_at);
+        """)
+
+    def document_path(self, job_id):
+        return os.path.join(self.documents_dir, job_id + ".bin")
+
+    # Function to queue a spooled upload (see uploads.py) and return its job ID.
+    # The spool file is moved next to the queue, so it outlives the request.
+    def submit(self, upload, filename, fields, job_description=None):
+        job_id = uuid.uuid4().hex
+        upload.move_to(self.document_path(job_id))
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO jobs (job_id, filename, fields, job_description, status, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, filename, json.dumps(fields), job_description, now, now, now),
+            )
+        return job_id
+
+    # Function to take the oldest job that is ready to run, or None. Jobs whose
+    # worker's lease ran out are taken over; each claim counts as an attempt.
+    def claim(self):
+        now = time.time()
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.connection.execute(
+                    "SELECT job_id, filename, fields, job_description, attempts FROM jobs "
+                    "WHERE (status = 'queued' AND available_at <= ?) OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY available_at LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    self.connection.execute("COMMIT")
+                    return None
+                job_id, filename, fields, job_description, attempts = row
+                if attempts >= self.max_attempts:
+                    # The last worker to hold it never came back
+                    self._finish(job_id, "failed", None, "Gave up after the worker stopped responding")
+                    self.connection.execute("COMMIT")
+                    self._remove_document(job_id)
+                    return None
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? WHERE job_id = ?",
+                    (now + self.lease_seconds, now, job_id),
+                )
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        return {
+            "job_id": job_id,
+            "filename": filename,
+            "fields": json.loads(fields),
+            "job_description": job_description,
+            "attempts": attempts + 1,
+        }
+
+    # Function to store the result of a finished job. attempts is the one claim()
+    # returned: a worker whose lease ran out and whose job was claimed again no longer
+    # holds it, and its result is ignored. Returns False if it was.
+    def complete(self, job_id, result, attempts):
+        with self.lock:
+            if not self._finish(job_id, "done", json.dumps(result), None, attempts):
+                return False
+        self._remove_document(job_id)
+        return True
+
+    # Function to record a failed attempt. Transient failures are retried with an
+    # exponential backoff until max_attempts is reached; others fail the job at once.
+    # As with complete(), a worker that no longer holds the job is ignored.
+    def fail(self, job_id, error, transient, attempts):
+        with self.lock:
+            if transient and attempts < self.max_attempts:
+                now = time.time()
+                return self.connection.execute(
+                    "UPDATE jobs SET status = 'queued', available_at = ?, lease_until = NULL, error = ?, updated_at = ? "
+                    "WHERE job_id = ? AND status = 'running' AND attempts = ?",
+                    (now + 2 ** attempts, error, now, job_id, attempts),
+                ).rowcount > 0
+            if not self._finish(job_id, "failed", None, error, attempts):
+                return False
+        self._remove_document(job_id)
+        return True
+
+    # Function to set a job's final status; with attempts, only if it is still running
+    # that attempt. Returns False if no job was updated.
+    def _finish(self, job_id, status, result, error, attempts=None):
+        query = "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, updated_at = ? WHERE job_id = ?"
+        parameters = (status, result, error, time.time(), job_id)
+        if attempts is not None:
+            query += " AND status = 'running' AND attempts = ?"
+            parameters += (attempts,)
+        return self.connection.execute(query, parameters).rowcount > 0
+
+    def _remove_document(self, job_id):
+        try:
+            os.remove(self.document_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    # Function to get a job's status, and its result or error once it has one; None if unknown
+    def get(self, job_id):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT job_id, filename, status, attempts, result, error, created_at, updated_at FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, filename, status, attempts, result, error, created_at, updated_at = row
+        job = {"job_id": job_id, "filename": filename, "status": status, "attempts": attempts, "created_at": created_at, "updated_at": updated_at}
+        if result is not None:
+            job["result"] = json.loads(result)
+        if error is not None:
+            job["error"] = error
+        return job
+
+    # Function to count the jobs in each status
+    def stats(self):
+        with self.lock:
+            return dict(self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# Function to compute the requested /analyze/ fields of a queued resume
+def process_job(queue, job):
+    (result, _), flags = run_budgeted(None, call_with_document, analyze_document, queue.document_path(job["job_id"]), job["fields"])
+    response = {}
+    if "name" in job["fields"]:
+        response["candidate_name"] = result["candidate_name"]
+    if "skills" in job["fields"]:
+        response["skills"] = result["normalized_skills"]
+    if "certifications" in job["fields"]:
+        response["certifications"] = result["certifications"]
+    if "sections" in job["fields"]:
+        response["sections"] = result["sections"]
+    if "score" in job["fields"]:
+        job_skills = extract_normalized_skills(job["job_description"] or "")
+        response["score"], response["common_skills"] = calculate_matching_score(result["normalized_skills"], job_skills)
+    response.update(flags)
+    return response
+
+
+# Function to run jobs from the queue until the process is told to stop
+def run_worker(path, documents_dir=None, max_attempts=3, lease_seconds=300, poll_interval=0.5):
+    # The API (or CLI) that started the worker handles Ctrl+C; the worker just stops
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    queue = JobQueue(path, documents_dir, max_attempts, lease_seconds)
+    while True:
+        job = queue.claim()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        try:
+            result = process_job(queue, job)
+        except Exception as e:
+            queue.fail(job["job_id"], str(e) or type(e).__name__, isinstance(e, transient_errors), job["attempts"])
+        else:
+            queue.complete(job["job_id"], result, job["attempts"])
+
+
+# Local worker processes that drain a JobQueue
+class JobWorkers:
+    def __init__(self, path, concurrency=2, documents_dir=None, max_attempts=3, lease_seconds=300):
+        self.args = (path, documents_dir, max_attempts, lease_seconds)
+        self.concurrency = concurrency
+        self.processes = []
+
+    def start(self):
+        # Spawned rather than forked, so workers don't inherit the server's threads and sockets
+        context = multiprocessing.get_context("spawn")
+        for _ in range(self.concurrency):
+            process = context.Process(target=run_worker, args=self.args, daemon=True)
+            process.start()
+            self.processes.append(process)
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(timeout=5)
+        self.processes = []
+
+
+# Function to run job workers in their own processes, e.g. for an API started with JOB_WORKERS=0
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run workers for the resume extraction job queue.")
+    parser.add_argument("queue", help="SQLite file of the job queue (JOB_QUEUE_PATH of the API)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--lease-seconds", type=float, default=300)
+    args = parser.parse_args(argv)
+
+    workers = JobWorkers(args.queue, args.workers, max_attempts=args.max_attempts, lease_seconds=args.lease_seconds)
+    workers.start()
+    try:
+        for process in workers.processes:
+            process.join()
+    except KeyboardInterrupt:
+        workers.stop()
+
+
+if __name__ == "__main__":
+    main()
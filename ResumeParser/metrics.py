@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (seconds) of the latency histogram buckets
+duration_buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=duration_buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+
+# Process-wide stage latency histograms and event counters
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stage_durations = {}
+        self.counters = Counter()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.stage_durations.get(stage)
+            if histogram is None:
+                histogram = self.stage_durations[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    # Function to render everything in the Prometheus text exposition format
+    def render_prometheus(self):
+        lines = [
+            "# HELP resume_stage_duration_seconds Time spent in each extraction stage.",
+            "# TYPE resume_stage_duration_seconds histogram",
+        ]
+        with self.lock:
+            for stage, histogram in sorted(self.stage_durations.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f'resume_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'resume_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'resume_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'resume_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE resume_{name}_total counter")
+                lines.append(f"resume_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Collects the spans and counts of one unit of work (an API request, a worker call,
+# a Streamlit analysis), on top of what goes into the registry
+class Recorder:
+    def __init__(self):
+        self.spans = []
+        self.counts = Counter()
+
+    # Function to get the total milliseconds spent in each stage
+    def breakdown(self):
+        totals = {}
+        for stage, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds * 1000
+        return totals
+
+    # Function to format the breakdown as a Server-Timing header value
+    def server_timing(self):
+        return ", ".join(f"{stage};dur={milliseconds:.2f}" for stage, milliseconds in self.breakdown().items())
+
+
+registry = MetricsRegistry()
+_current_recorder = ContextVar("current_recorder", default=None)
+
+
+# Function to make a recorder current for the code that runs in this context
+def start_recording():
+    recorder = Recorder()
+    _current_recorder.set(recorder)
+    return recorder
+
+
+# Function to time a block of code as one span of the given stage
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - start)
+
+
+def record_span(stage, seconds):
+    registry.observe(stage, seconds)
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.spans.append((stage, seconds))
+
+
+# Function to count an event, e.g. pages decoded or bytes uploaded
+def count(name, value=1):
+    registry.increment(name, value)
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.counts[name] += value
+
+
+# Function to run fn in a worker process and send its spans and counts back with
+# the result, since the worker's own registry is never scraped
+def run_recorded(fn, *args):
+    recorder = Recorder()
+    token = _current_recorder.set(recorder)
+    try:
+        return fn(*args), recorder.spans, dict(recorder.counts)
+    finally:
+        _current_recorder.reset(token)
+
+
+# Function to fold the spans and counts returned by run_recorded into this process
+def merge_recorded(spans, counts):
+    for stage, seconds in spans:
+        record_span(stage, seconds)
+    for name, value in counts.items():
+        count(name, value)
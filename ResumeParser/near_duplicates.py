@@ -0,0 +1,227 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import zlib
+import numpy as np
+from metrics import timed
+
+# Resumes are compared on overlapping runs of this many words
+shingle_size = 5
+
+# Number of MinHash values in a signature; the share of equal values estimates the
+# Jaccard similarity of two resumes' shingle sets
+signature_size = 128
+
+# Similarity above which two resumes count as the same one resubmitted
+default_threshold = 0.9
+
+# Shingle hashes are permuted as (a * x + b) mod a prime just below 2**32; a, b and
+# x are all below 2**32, so the products fit in uint64
+_prime = np.uint64(4294967291)
+_permutations = np.random.default_rng(20240611).integers(1, 2 ** 32, size=(2, signature_size), dtype=np.uint64)
+
+# Shingle hashes are permuted this many at a time, which bounds the memory it takes
+_block_size = 4096
+
+
+# Function to split text into the words compared: lowercase, with every number
+# turned into 0 so a changed date or phone number doesn't change the shingles
+def normalize_text(text):
+    return re.findall(r"\w+", re.sub(r"\d+", "0", text.lower()))
+
+
+# Function to hash the distinct word shingles of a text
+def shingle_hashes(text):
+    words = normalize_text(text)
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles if shingle), dtype=np.uint64)
+
+
+# Function to compute the MinHash signature of a resume's text, or None if it has no words
+def text_signature(text):
+    with timed("fingerprint"):
+        hashes = shingle_hashes(text)
+        if hashes.size == 0:
+            return None
+        a, b = _permutations
+        signature = np.full(signature_size, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, hashes.size, _block_size):
+            block = hashes[start:start + _block_size]
+            permuted = (np.outer(a, block) + b[:, None]) % _prime
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+
+# Function to estimate the Jaccard similarity of two resumes from their signatures
+def similarity(signature, other):
+    return float(np.count_nonzero(np.asarray(signature) == np.asarray(other))) / signature_size
+
+
+# Function to choose how the signature is cut into LSH bands. Two resumes become
+# candidates when all rows of some band agree, which for resumes of similarity s
+# happens with probability 1 - (1 - s ** rows) ** bands. The most rows per band,
+# i.e. the fewest unrelated pairs compared, that still catch 90% of the pairs right
+# at the threshold (and nearly all of those above it) are used.
+def lsh_bands(threshold, size=signature_size):
+    for rows in range(size, 0, -1):
+        bands = size // rows
+        if 1 - (1 - threshold ** rows) ** bands >= 0.9:
+            return bands, rows
+    return size, 1
+
+
+def _bucket(band, values):
+    digest = hashlib.blake2b(values.tobytes(), digest_size=8, person=band.to_bytes(8, "big")).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+# Persistent LSH index of resume signatures. Finding a resume's near-duplicate only
+# compares it with the resumes that share a band bucket with it, so its cost stays
+# flat as the index grows. Each resume can carry the fields extracted from it, so a
+# near-duplicate can reuse them instead of extracting them again. Use ":memory:" as
+# path for an index that lives only as long as the object.
+class NearDuplicateIndex:
+    def __init__(self, path=":memory:", threshold=default_threshold):
+        self.path = path
+        self.threshold = threshold
+        self.bands, self.rows = lsh_bands(threshold)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS signatures (
+                document_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                fields TEXT
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                document_id TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, document_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS settings (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self._check_bands()
+
+    # The buckets depend on the banding, and so on the threshold; an index opened
+    # with another threshold than it was built with gets its buckets rebuilt
+    def _check_bands(self):
+        banding = f"{self.bands}x{self.rows}"
+        with self.lock, self.connection:
+            row = self.connection.execute("SELECT value FROM settings WHERE name = 'banding'").fetchone()
+            if row is not None and row[0] == banding:
+                return
+            self.connection.execute("DELETE FROM buckets")
+            for document_id, signature in self.connection.execute("SELECT document_id, signature FROM signatures").fetchall():
+                self._add_buckets(document_id, np.frombuffer(signature, dtype=np.uint32))
+            self.connection.execute("INSERT OR REPLACE INTO settings (name, value) VALUES ('banding', ?)", (banding,))
+
+    def _buckets(self, signature):
+        signature = np.asarray(signature, dtype=np.uint32)
+        return [(band, _bucket(band, signature[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands)]
+
+    def _add_buckets(self, document_id, signature):
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO buckets (band, bucket, document_id) VALUES (?, ?, ?)",
+            [(band, bucket, document_id) for band, bucket in self._buckets(signature)],
+        )
+
+    # Function to add a resume, replacing whatever was indexed under the same ID
+    def add(self, document_id, signature, fields=None):
+        self.add_many([(document_id, signature, fields)])
+
+    # Function to add many (document_id, signature, fields) records in one transaction
+    def add_many(self, records):
+        with self.lock, self.connection:
+            for document_id, signature, fields in records:
+                signature = np.asarray(signature, dtype=np.uint32)
+                self._remove(document_id)
+                self.connection.execute(
+                    "INSERT INTO signatures (document_id, signature, fields) VALUES (?, ?, ?)",
+                    (document_id, signature.tobytes(), json.dumps(fields) if fields is not None else None),
+                )
+                self._add_buckets(document_id, signature)
+
+    # Function to remove a resume; returns False if it wasn't indexed
+    def remove(self, document_id):
+        with self.lock, self.connection:
+            return self._remove(document_id)
+
+    def _remove(self, document_id):
+        row = self.connection.execute("SELECT signature FROM signatures WHERE document_id = ?", (document_id,)).fetchone()
+        if row is None:
+            return False
+        self.connection.executemany(
+            "DELETE FROM buckets WHERE band = ? AND bucket = ? AND document_id = ?",
+            [(band, bucket, document_id) for band, bucket in self._buckets(np.frombuffer(row[0], dtype=np.uint32))],
+        )
+        self.connection.execute("DELETE FROM signatures WHERE document_id = ?", (document_id,))
+        return True
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    # Function to get the fields a resume was indexed with; None if it wasn't indexed
+    # or was indexed without fields
+    def indexed_fields(self, document_id):
+        with self.lock:
+            row = self.connection.execute("SELECT fields FROM signatures WHERE document_id = ?", (document_id,)).fetchone()
+        return json.loads(row[0]) if row is not None and row[0] else None
+
+    # Function to find the indexed resume most similar to a signature, if it is at
+    # least threshold similar: {"document_id", "similarity", "fields"}, else None.
+    # exclude is the resume's own ID, so one indexed before isn't its own duplicate.
+    def find(self, signature, exclude=None):
+        if signature is None:
+            return None
+        signature = np.asarray(signature, dtype=np.uint32)
+        with timed("near_duplicate_lookup"), self.lock:
+            candidate_ids = set()
+            for band, bucket in self._buckets(signature):
+                candidate_ids.update(document_id for document_id, in self.connection.execute(
+                    "SELECT document_id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                ))
+            best = None
+            candidate_ids.discard(exclude)
+            for document_id in sorted(candidate_ids):
+                stored, fields = self.connection.execute(
+                    "SELECT signature, fields FROM signatures WHERE document_id = ?", (document_id,)
+                ).fetchone()
+                score = similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+                if score >= self.threshold and (best is None or score > best["similarity"]):
+                    best = {"document_id": document_id, "similarity": score, "fields": json.loads(fields) if fields else None}
+            return best
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# Function to collapse near-duplicate resumes in a ranked list: the best ranked copy
+# stays in place and lists the others under "duplicates"; the rest are dropped.
+# Each candidate's "fingerprint" (its signature, or None) is taken out of the result.
+def collapse_near_duplicates(ranked, threshold=default_threshold, key="filename"):
+    index = NearDuplicateIndex(":memory:", threshold)
+    kept = {}
+    collapsed = []
+    try:
+        for position, candidate in enumerate(ranked):
+            signature = candidate.pop("fingerprint", None)
+            match = index.find(signature)
+            if match is not None:
+                kept[match["document_id"]].setdefault("duplicates", []).append(candidate[key])
+                continue
+            if signature is not None:
+                index.add(str(position), signature)
+                kept[str(position)] = candidate
+            collapsed.append(candidate)
+    finally:
+        index.close()
+    return collapsed
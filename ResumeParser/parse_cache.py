@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from metrics import count
+
+# Version of what the cached fields hold; bump it when an extractor changes so
+# entries written to disk by an older version are not served
+cache_version = 4
+
+
+# Function to compute the cache key of a document from its raw bytes
+def document_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+# Approximate memory cost of cached page texts, used for the byte budget
+def _pages_size(pages):
+    return sum(len(page.encode("utf-8")) for page in pages) if pages else 0
+
+
+# Approximate memory cost of a cached field
+def _field_size(name, value):
+    return len(name) + len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def _entry_size(entry):
+    return _pages_size(entry["pages"]) + sum(_field_size(name, value) for name, value in entry["fields"].items())
+
+
+# Content-addressed cache of extracted page texts and derived fields.
+# Entries live in an in-memory LRU bounded by max_bytes, and are also
+# written to cache_dir (when given) so they survive a restart. On disk the
+# pages and the fields of an entry are separate files: pages are written once,
+# and a new field only rewrites the (small) fields file, merged with whatever
+# other processes sharing the directory have added to it.
+class ParseCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key, part):
+        return os.path.join(self.cache_dir, f"{key}.v{cache_version}.{part}.json")
+
+    def _read_part(self, key, part):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key, part), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_part(self, key, part, value):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key, part)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def _load_from_disk(self, key):
+        pages = self._read_part(key, "pages")
+        fields = self._read_part(key, "fields")
+        if pages is None and fields is None:
+            return None
+        return {"pages": pages, "fields": fields or {}}
+
+    # Function to add a field to the fields file on disk, keeping the fields already there
+    def _write_field(self, key, name, value):
+        if not self.cache_dir:
+            return
+        fields = self._read_part(key, "fields") or {}
+        if name in fields and fields[name] == value:
+            return
+        fields[name] = value
+        self._write_part(key, "fields", fields)
+
+    # Store an entry of the given size in the memory tier and evict least recently
+    # used entries. Entries larger than the whole cache only live on disk.
+    def _remember(self, key, entry, size):
+        if key in self.entries:
+            self.current_bytes -= self.sizes.pop(key)
+            del self.entries[key]
+
+        if size > self.max_bytes:
+            return
+
+        self.entries[key] = entry
+        self.sizes[key] = size
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            old_key, _ = self.entries.popitem(last=False)
+            self.current_bytes -= self.sizes.pop(old_key)
+            self.evictions += 1
+
+    # Look up an entry in memory, then on disk; None on a miss
+    def _lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            count("parse_cache_hits")
+            return entry
+
+        entry = self._load_from_disk(key)
+        if entry is not None:
+            self.disk_hits += 1
+            count("parse_cache_disk_hits")
+            self._remember(key, entry, _entry_size(entry))
+            return entry
+
+        self.misses += 1
+        count("parse_cache_misses")
+        return None
+
+    # Function to get the cached entry of a document ({"pages", "fields"}); None on a miss.
+    # "pages" is None when only fields that don't need the full text have been computed.
+    def lookup(self, key):
+        with self.lock:
+            return self._lookup(key)
+
+    # Function to cache the page texts of a document
+    def put_pages(self, key, pages):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = {"pages": None, "fields": self._read_part(key, "fields") or {}}
+                size = _entry_size(entry)
+            else:
+                size = self.sizes[key]
+            size += _pages_size(pages) - _pages_size(entry["pages"])
+            entry["pages"] = pages
+            self._remember(key, entry, size)
+            self._write_part(key, "pages", pages)
+
+    # Function to cache a derived field of a document
+    def put_field(self, key, name, value):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.cache_dir:
+                # The entry is only on disk (evicted, or too large to keep in memory):
+                # add the field there, and the next lookup loads the whole entry
+                self._write_field(key, name, value)
+                return
+            if entry is None:
+                entry = {"pages": None, "fields": {}}
+                size = 0
+            else:
+                size = self.sizes[key]
+            if name in entry["fields"]:
+                if entry["fields"][name] == value:
+                    return
+                size -= _field_size(name, entry["fields"][name])
+            entry["fields"][name] = value
+            self._remember(key, entry, size + _field_size(name, value))
+            self._write_field(key, name, value)
+
+    # Function to report the cache counters
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
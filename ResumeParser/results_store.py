@@ -0,0 +1,308 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import uuid
+import numpy as np
+from skill_matcher import skill_matcher
+from sections import section_kinds
+
+# Version of the on-disk layout; bump it when a column changes
+store_version = 1
+
+
+# Function to load a column written with np.save as a read-only memory-mapped array
+def _load_column(path):
+    return np.load(path, mmap_mode="r")
+
+
+# A column of strings, kept as one UTF-8 blob and the offset where each string starts
+class StringColumn:
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return bytes(self.data[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+
+# Function to turn strings into the offsets and data arrays of a StringColumn
+def _string_arrays(values):
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+# One immutable batch of rows, one file per column:
+# - candidate_ids, names: StringColumn (a missing name is stored as "")
+# - skills: rows x ceil(len(vocabulary) / 8) uint8, the packed skill-ID bitsets
+#   (bit i is skill i of the store's vocabulary, as score_matrix.ScoringEngine uses them)
+# - sections: rows x len(section_kinds) x 2 int32, the start and end offsets of the
+#   first section of each kind in the extracted text, -1 where there is none
+# - document_hashes: rows x 32 uint8, the SHA-256 of each document
+class Segment:
+    def __init__(self, path):
+        self.path = path
+        self.candidate_ids = StringColumn(_load_column(os.path.join(path, "candidate_ids.offsets.npy")), _load_column(os.path.join(path, "candidate_ids.data.npy")))
+        self.names = StringColumn(_load_column(os.path.join(path, "names.offsets.npy")), _load_column(os.path.join(path, "names.data.npy")))
+        self.skills = _load_column(os.path.join(path, "skills.npy"))
+        self.sections = _load_column(os.path.join(path, "sections.npy"))
+        self.document_hashes = _load_column(os.path.join(path, "document_hashes.npy"))
+
+    def __len__(self):
+        return len(self.skills)
+
+
+# Function to write a segment's columns to a new directory. It is written under a
+# temporary name and renamed into place, so a segment either exists whole or not at all.
+def _write_segment(path, candidate_ids, names, skills, sections, document_hashes):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path)
+    for column, values in (("candidate_ids", candidate_ids), ("names", names)):
+        offsets, data = _string_arrays(values)
+        np.save(os.path.join(tmp_path, f"{column}.offsets.npy"), offsets)
+        np.save(os.path.join(tmp_path, f"{column}.data.npy"), data)
+    np.save(os.path.join(tmp_path, "skills.npy"), skills)
+    np.save(os.path.join(tmp_path, "sections.npy"), sections)
+    np.save(os.path.join(tmp_path, "document_hashes.npy"), document_hashes)
+    os.replace(tmp_path, path)
+
+
+# Append-only columnar store of extraction results: candidate ID, name, skill-ID
+# bitset, section offsets and document hash of every candidate. Each append writes
+# a new segment of fixed-width column files, and readers memory-map them, so a
+# ranking or analytics process can open millions of candidates in milliseconds
+# without parsing JSON (about 200 bytes per candidate with the default taxonomy).
+# A manifest lists the live segments; compaction merges them into one, keeping only
+# the last row appended for each candidate ID. Until then, readers skip the rows a
+# later one superseded (see live_rows). One process writes at a time.
+class ResultsStore:
+    def __init__(self, directory, vocabulary=None, max_segments=16):
+        self.directory = directory
+        self.max_segments = max_segments
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        manifest = self._read_manifest()
+        if manifest is None:
+            manifest = {
+                "version": store_version,
+                "vocabulary": list(vocabulary or skill_matcher.taxonomy.display_names),
+                "section_kinds": list(section_kinds),
+                "segments": [],
+            }
+            self._write_manifest(manifest)
+        if manifest["version"] != store_version:
+            raise ValueError(f"{directory} holds a version {manifest['version']} results store, expected version {store_version}")
+        # The vocabulary the store was created with is kept, so skill IDs stay valid
+        # after the taxonomy is rebuilt
+        self.vocabulary = manifest["vocabulary"]
+        self.positions = {skill: position for position, skill in enumerate(self.vocabulary)}
+        self.section_kinds = manifest["section_kinds"]
+        self.segments = [Segment(os.path.join(directory, name)) for name in manifest["segments"]]
+        self._live_rows = None
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest):
+        path = self._manifest_path()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def _commit_segments(self, segments):
+        manifest = self._read_manifest()
+        manifest["segments"] = [os.path.basename(segment.path) for segment in segments]
+        self._write_manifest(manifest)
+        self.segments = segments
+
+    # Function to pick up segments another process appended or compacted since this one opened the store
+    def refresh(self):
+        with self.lock:
+            names = self._read_manifest()["segments"]
+            current = {os.path.basename(segment.path): segment for segment in self.segments}
+            self.segments = [current.get(name) or Segment(os.path.join(self.directory, name)) for name in names]
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.segments)
+
+    # Function to append candidates as one new segment. Each record is a dict with
+    # candidate_id, candidate_name, skills (canonical names, as scoring.normalize_skills
+    # gives them; others are ignored), sections (as sections.sections_to_dicts gives
+    # them) and document_hash (hex SHA-256).
+    def append(self, records):
+        records = list(records)
+        if not records:
+            return
+        skills = np.zeros((len(records), len(self.vocabulary)), dtype=bool)
+        sections = np.full((len(records), len(self.section_kinds), 2), -1, dtype=np.int32)
+        document_hashes = np.zeros((len(records), 32), dtype=np.uint8)
+        kind_positions = {kind: position for position, kind in enumerate(self.section_kinds)}
+        for row, record in enumerate(records):
+            for skill in record.get("skills") or ():
+                position = self.positions.get(skill)
+                if position is not None:
+                    skills[row, position] = True
+            for section in reversed(record.get("sections") or ()):
+                position = kind_positions.get(section["kind"])
+                if position is not None:
+                    sections[row, position] = (section["start"], section["end"])
+            if record.get("document_hash"):
+                document_hashes[row] = np.frombuffer(bytes.fromhex(record["document_hash"]), dtype=np.uint8)
+
+        with self.lock:
+            path = os.path.join(self.directory, f"segment-{uuid.uuid4().hex}")
+            _write_segment(
+                path,
+                [record["candidate_id"] for record in records],
+                [record.get("candidate_name") or "" for record in records],
+                np.packbits(skills, axis=1),
+                sections,
+                document_hashes,
+            )
+            self._commit_segments(self.segments + [Segment(path)])
+            if len(self.segments) > self.max_segments:
+                self._compact(self._segments_to_merge())
+
+    # Segments appended since the last large merge are merged on their own while they
+    # hold fewer rows than the oldest segment, so each row is rewritten only a few times
+    def _segments_to_merge(self):
+        newer = self.segments[1:]
+        if sum(len(segment) for segment in newer) < len(self.segments[0]):
+            return newer
+        return self.segments
+
+    # Function to merge every segment into one, dropping all but the last row of each candidate
+    def compact(self):
+        with self.lock:
+            if len(self.segments) > 1 or any(self._has_replaced_rows(segment) for segment in self.segments):
+                self._compact(self.segments)
+
+    def _has_replaced_rows(self, segment):
+        return len(set(segment.candidate_ids)) < len(segment)
+
+    def _compact(self, merged):
+        # The last row of each candidate ID among the merged segments wins; a later
+        # segment that is not merged still overrides them when read
+        last = {}
+        for segment_index, segment in enumerate(merged):
+            for row, candidate_id in enumerate(segment.candidate_ids):
+                last[candidate_id] = (segment_index, row)
+        keep = [np.zeros(len(segment), dtype=bool) for segment in merged]
+        for segment_index, row in last.values():
+            keep[segment_index][row] = True
+
+        path = os.path.join(self.directory, f"segment-{uuid.uuid4().hex}")
+        _write_segment(
+            path,
+            [segment.candidate_ids[row] for segment, mask in zip(merged, keep) for row in np.flatnonzero(mask)],
+            [segment.names[row] for segment, mask in zip(merged, keep) for row in np.flatnonzero(mask)],
+            np.concatenate([segment.skills[mask] for segment, mask in zip(merged, keep)]),
+            np.concatenate([segment.sections[mask] for segment, mask in zip(merged, keep)]),
+            np.concatenate([segment.document_hashes[mask] for segment, mask in zip(merged, keep)]),
+        )
+
+        position = self.segments.index(merged[0])
+        remaining = [segment for segment in self.segments if segment not in merged]
+        self._commit_segments(remaining[:position] + [Segment(path)] + remaining[position:])
+        # Readers that still map the old files keep them until they let go
+        for segment in merged:
+            shutil.rmtree(segment.path, ignore_errors=True)
+
+    # Function to get the numbers (as record() takes them) of the rows that hold each
+    # candidate's latest result, in order; rows superseded by a later one are left out.
+    # Worked out once for each set of segments.
+    def live_rows(self):
+        with self.lock:
+            segments = tuple(segment.path for segment in self.segments)
+            if self._live_rows is None or self._live_rows[0] != segments:
+                last = {}
+                row = 0
+                for segment in self.segments:
+                    for candidate_id in segment.candidate_ids:
+                        last[candidate_id] = row
+                        row += 1
+                rows = np.sort(np.fromiter(last.values(), dtype=np.int64, count=len(last)))
+                self._live_rows = (segments, rows)
+            return self._live_rows[1]
+
+    # Function to get the packed skill bitsets of the live rows: row i of the result is
+    # record(live_rows()[i]). A memory-mapped view when the store is a single segment
+    # with no superseded rows (e.g. after compact()), else a copy.
+    def skills(self):
+        rows = self.live_rows()
+        if len(self.segments) == 1 and len(rows) == len(self):
+            return self.segments[0].skills
+        if not self.segments:
+            return np.zeros((0, (len(self.vocabulary) + 7) // 8), dtype=np.uint8)
+        skills = np.concatenate([segment.skills for segment in self.segments])
+        return skills if len(rows) == len(self) else skills[rows]
+
+    def _locate(self, row):
+        for segment in self.segments:
+            if row < len(segment):
+                return segment, row
+            row -= len(segment)
+        raise IndexError(row)
+
+    # Function to read one row back as a dict like the records given to append()
+    def record(self, row):
+        segment, row = self._locate(row)
+        skill_bits = np.unpackbits(segment.skills[row], count=len(self.vocabulary))
+        return {
+            "candidate_id": segment.candidate_ids[row],
+            "candidate_name": segment.names[row] or None,
+            "skills": [self.vocabulary[position] for position in np.flatnonzero(skill_bits)],
+            "sections": [
+                {"kind": kind, "start": int(start), "end": int(end)}
+                for kind, (start, end) in zip(self.section_kinds, segment.sections[row]) if start >= 0
+            ],
+            "document_hash": bytes(segment.document_hashes[row]).hex(),
+        }
+
+    def __iter__(self):
+        return (self.record(row) for row in range(len(self)))
+
+    def stats(self):
+        return {
+            "rows": len(self),
+            "live_rows": len(self.live_rows()),
+            "segments": len(self.segments),
+            "bytes": sum(
+                os.path.getsize(os.path.join(segment.path, name))
+                for segment in self.segments for name in os.listdir(segment.path)
+            ),
+        }
+
+
+# Function to inspect or compact a results store from the command line
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or compact a columnar results store.")
+    parser.add_argument("command", choices=("stats", "compact"))
+    parser.add_argument("store", help="directory of the results store")
+    args = parser.parse_args(argv)
+
+    store = ResultsStore(args.store)
+    if args.command == "compact":
+        store.compact()
+    print(json.dumps(store.stats()))
+
+
+if __name__ == "__main__":
+    main()
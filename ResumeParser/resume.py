@@ -0,0 +1,195 @@
+import re
+import weakref
+from contextlib import ExitStack
+from skill_matcher import skill_matcher
+from text_extraction import iter_document_pages, open_document, LazyPages
+from scoring import extract_normalized_skills
+from sections import SectionSegmenter, contact_text, skills_text
+from uploads import spool_stream
+from near_duplicates import text_signature
+from budgets import ExtractionBudget, current_budget, default_budget
+from metrics import timed
+
+
+name_pattern = re.compile(r'\b[A-Z][a-zA-Z]* [A-Z][a-zA-Z]*\b')
+
+
+def _find_name(contact):
+    candidate_name = name_pattern.search(contact)
+    return candidate_name.group() if candidate_name else None
+
+
+# Function to list the certifications, hobbies, and interests: the lines of the first
+# certifications section and of the certifications/hobbies sections right after it
+def certifications_from_sections(text, sections):
+    block = _certifications_block(sections)
+    if block is None:
+        return None
+    lines = []
+    for section in block:
+        lines.extend(line.strip() for line in text[section.start:section.end].split('\n') if line.strip())
+    return lines
+
+
+def _certifications_block(sections):
+    for index, section in enumerate(sections):
+        if section.kind == "certifications":
+            end = index + 1
+            while end < len(sections) and sections[end].kind in ("certifications", "hobbies"):
+                end += 1
+            return sections[index:end]
+    return None
+
+
+# A Resume attribute computed on first use and remembered for the life of the object.
+# depends_on names the fields it reads; they are computed first, and the graph is
+# kept in Resume.dependencies. Every field ultimately reads resume.pages, which
+# decodes pages only as far as some field has asked for them.
+class field:
+    def __init__(self, *depends_on):
+        self.depends_on = depends_on
+
+    def __call__(self, compute):
+        self.compute = compute
+        return self
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        owner.dependencies[name] = self.depends_on
+
+    def __get__(self, resume, owner=None):
+        if resume is None:
+            return self
+        if self.name not in resume._values:
+            for dependency in self.depends_on:
+                getattr(resume, dependency)
+            resume._values[self.name] = self.compute(resume)
+        return resume._values[self.name]
+
+
+# One resume and everything extracted from it, each field computed at most once.
+# Give it the document's bytes (or a memory-mapped view), or the page texts when
+# they are already known. Pages are decoded within budget (by default the one
+# run_budgeted made current, else none), and one section segmenter is shared by
+# every field: the certifications read only the pages up to the end of their
+# section, and a later full segmentation carries on from where they stopped.
+class Resume:
+    dependencies = {}
+
+    def __init__(self, content=None, pages=None, budget=None):
+        self.budget = budget or current_budget() or ExtractionBudget()
+        self.pages = LazyPages(pages if pages is not None else iter_document_pages(content, self.budget))
+        self._values = {}
+        self._segmenter = SectionSegmenter()
+        self._unsegmented_pages = iter(self.pages)
+
+    @field()
+    def first_page(self):
+        return next(iter(self.pages), "")
+
+    # The full text is the one the segmenter joins (with a line break between pages
+    # that don't end in one), so it is held only once
+    @field()
+    def text(self):
+        self.pages.all()
+        with timed("segmentation"):
+            while self._segment_next_page():
+                pass
+        return self._segmenter.text
+
+    @field("first_page")
+    def name(self):
+        with timed("name_extraction"):
+            return _find_name(contact_text(self.first_page) or self.first_page)
+
+    # Every page has been fed to the segmenter once the text is known
+    @field("text")
+    def sections(self):
+        return self._segmenter.sections()
+
+    # The part of the text the skill matcher reads
+    @field("text", "sections")
+    def skills_source(self):
+        return skills_text(self.text, self.sections)
+
+    # The skills as written in the resume
+    @field("skills_source")
+    def skills(self):
+        return skill_matcher.match_keywords(self.skills_source)
+
+    # The skills mapped to their canonical names, as scoring uses them
+    @field("skills_source")
+    def normalized_skills(self):
+        return extract_normalized_skills(self.skills_source)
+
+    # MinHash signature of the text, to recognise the same resume resubmitted with
+    # small changes (see near_duplicates.py); None if the text has no words
+    @field("text")
+    def fingerprint(self):
+        return text_signature(self.text)
+
+    # Pages are read only until a heading closes the certifications block
+    @field()
+    def certifications(self):
+        # When pages are decoded lazily, this span includes their extract_page spans
+        with timed("section_extraction"):
+            while True:
+                sections = self._segmenter.sections()
+                block = _certifications_block(sections)
+                # The block is complete once a heading of another kind follows it
+                if block is not None and block[-1] is not sections[-1]:
+                    break
+                if not self._segment_next_page():
+                    sections = self._segmenter.sections()
+                    break
+            return certifications_from_sections(self._segmenter.text, sections)
+
+    # Function to feed the shared segmenter the next page; False once every page has been fed
+    def _segment_next_page(self):
+        page = next(self._unsegmented_pages, None)
+        if page is None:
+            self._segmenter.close()
+            return False
+        self._segmenter.feed(page)
+        return True
+
+    # Function to get the budget's truncated/timed_out flags for the pages decoded so far
+    def flags(self):
+        return self.budget.flags()
+
+
+# A Resume over an uploaded file, for front ends that keep one document across many
+# requests. The upload is spooled to disk (see uploads.py) and read through a
+# memory-mapped view; both stay open until close(), or until the resume is garbage
+# collected (e.g. with the Streamlit session that held it).
+class UploadedResume(Resume):
+    def __init__(self, stream, budget=None):
+        self.resources = ExitStack()
+        try:
+            upload = self.resources.enter_context(spool_stream(stream))
+            content = self.resources.enter_context(open_document(upload.path))
+            super().__init__(content, budget=budget)
+        except BaseException:
+            self.resources.close()
+            raise
+        self._finalizer = weakref.finalize(self, self.resources.close)
+
+    def close(self):
+        self._finalizer()
+
+
+# Function to get the Resume of a Streamlit upload, kept in session_state so every
+# rerun (each button click) reuses what earlier ones extracted. Uploading another
+# file replaces it. The time budget counts only the time spent extracting.
+def session_resume(session_state, uploaded_file):
+    key = (getattr(uploaded_file, "file_id", None), uploaded_file.name, uploaded_file.size)
+    resume = session_state.get("resume")
+    if resume is not None and resume.key == key:
+        return resume
+    if resume is not None:
+        resume.close()
+        del session_state["resume"]
+    resume = UploadedResume(uploaded_file, default_budget.start())
+    resume.key = key
+    session_state["resume"] = resume
+    return resume
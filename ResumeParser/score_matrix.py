@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+from collections import defaultdict
+import numpy as np
+from skill_matcher import skill_matcher
+from scoring import normalize_skills, extract_normalized_skills
+from results_store import ResultsStore
+
+metrics = ("coverage", "jaccard", "weighted")
+
+
+# Scores many candidates against many job descriptions at once. Skill sets are
+# stored as packed bit vectors over a fixed vocabulary (by default the canonical
+# skills of the taxonomy, bit i being skill ID i) and unpacked a block at a time,
+# so an intersection count for a whole block is one matrix product.
+class ScoringEngine:
+    def __init__(self, vocabulary=None, weights=None, block_size=65536):
+        self.vocabulary = list(vocabulary or skill_matcher.taxonomy.display_names)
+        self.positions = {skill: position for position, skill in enumerate(self.vocabulary)}
+        self.block_size = block_size
+        weights = weights or {}
+        self.weights = np.array([weights.get(skill, 1.0) for skill in self.vocabulary], dtype=np.float32)
+
+    # Function to encode skill lists as packed bit vectors, one row per list.
+    # Skills outside the vocabulary are ignored.
+    def encode(self, skill_lists):
+        bits = np.zeros((len(skill_lists), len(self.vocabulary)), dtype=bool)
+        for row, skills in enumerate(skill_lists):
+            for skill in skills:
+                position = self.positions.get(skill)
+                if position is not None:
+                    bits[row, position] = True
+        return np.packbits(bits, axis=1)
+
+    # Function to turn packed bit vectors back into skill lists
+    def decode(self, packed):
+        bits = self._unpack(packed)
+        return [[self.vocabulary[position] for position in np.flatnonzero(row)] for row in bits]
+
+    def _unpack(self, packed):
+        return np.unpackbits(packed, axis=1, count=len(self.vocabulary)).astype(np.float32)
+
+    # Scores of every job (rows) against one block of candidates (columns)
+    def _score_block(self, candidate_bits, job_bits, job_sizes, metric):
+        if metric == "weighted":
+            common = job_bits @ (candidate_bits * self.weights).T
+        else:
+            common = job_bits @ candidate_bits.T
+
+        if metric == "jaccard":
+            denominator = job_sizes[:, None] + candidate_bits.sum(axis=1)[None, :] - common
+        else:
+            denominator = np.broadcast_to(job_sizes[:, None], common.shape)
+
+        scores = np.zeros_like(common)
+        np.divide(common, denominator, out=scores, where=denominator > 0)
+        return scores
+
+    def _job_sizes(self, job_bits, metric):
+        if metric == "weighted":
+            return job_bits @ self.weights
+        return job_bits.sum(axis=1)
+
+    def _blocks(self, candidates_packed):
+        for start in range(0, len(candidates_packed), self.block_size):
+            yield start, self._unpack(candidates_packed[start:start + self.block_size])
+
+    # Function to compute the full jobs x candidates score matrix
+    def score_matrix(self, candidates_packed, jobs_packed, metric="coverage"):
+        if metric not in metrics:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {metrics}")
+        job_bits = self._unpack(jobs_packed)
+        job_sizes = self._job_sizes(job_bits, metric)
+        scores = np.zeros((len(jobs_packed), len(candidates_packed)), dtype=np.float32)
+        for start, candidate_bits in self._blocks(candidates_packed):
+            scores[:, start:start + len(candidate_bits)] = self._score_block(candidate_bits, job_bits, job_sizes, metric)
+        return scores
+
+    # Function to find the k best candidates for every job without holding the
+    # whole score matrix; returns (indices, scores), each jobs x k, best first
+    def top_k(self, candidates_packed, jobs_packed, k=10, metric="coverage"):
+        if metric not in metrics:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {metrics}")
+        k = min(k, len(candidates_packed))
+        if k <= 0:
+            return np.zeros((len(jobs_packed), 0), dtype=np.int64), np.zeros((len(jobs_packed), 0), dtype=np.float32)
+        job_bits = self._unpack(jobs_packed)
+        job_sizes = self._job_sizes(job_bits, metric)
+        best_indices = np.zeros((len(jobs_packed), 0), dtype=np.int64)
+        best_scores = np.zeros((len(jobs_packed), 0), dtype=np.float32)
+
+        for start, candidate_bits in self._blocks(candidates_packed):
+            block_scores = self._score_block(candidate_bits, job_bits, job_sizes, metric)
+            block_indices = np.broadcast_to(np.arange(start, start + len(candidate_bits)), block_scores.shape)
+            scores = np.concatenate([best_scores, block_scores], axis=1)
+            indices = np.concatenate([best_indices, block_indices], axis=1)
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k] if scores.shape[1] > k else np.argsort(-scores, axis=1)
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_indices = np.take_along_axis(indices, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+# Function to rank the candidates of a bulk_ingest.py JSONL file for every job
+def top_extracted_candidates(candidates_path, jobs, k, metric):
+    # Near-duplicates of a resume (see bulk_ingest.py --near-duplicates) are ranked
+    # once, under the resume they duplicate
+    duplicates = defaultdict(list)
+    candidates = []
+    with open(candidates_path, encoding="utf-8") as f:
+        for record in map(json.loads, f):
+            if "error" in record:
+                continue
+            if "duplicate_of" in record:
+                duplicates[record["duplicate_of"]].append(record["source"])
+            else:
+                candidates.append(record)
+
+    engine = ScoringEngine()
+    candidates_packed = engine.encode([normalize_skills(candidate["skills"]) for candidate in candidates])
+    jobs_packed = engine.encode([extract_normalized_skills(job["job_description"]) for job in jobs])
+    indices, scores = engine.top_k(candidates_packed, jobs_packed, k, metric)
+
+    top_per_job = []
+    for job_indices, job_scores in zip(indices, scores):
+        top = []
+        for index, score in zip(job_indices, job_scores):
+            candidate = candidates[index]
+            entry = {"source": candidate["source"], "candidate_name": candidate["candidate_name"], "score": float(score)}
+            if duplicates.get(candidate.get("document_hash")):
+                entry["duplicates"] = duplicates[candidate["document_hash"]]
+            top.append(entry)
+        top_per_job.append(top)
+    return top_per_job
+
+
+# Function to rank the candidates of a results store for every job. The skill bitsets
+# are scored straight from the store's memory-mapped column; only the rows that make
+# a top k are read back. Rows superseded by a later result for the candidate are skipped.
+def top_stored_candidates(store, jobs, k, metric):
+    engine = ScoringEngine(vocabulary=store.vocabulary)
+    jobs_packed = engine.encode([extract_normalized_skills(job["job_description"]) for job in jobs])
+    rows = store.live_rows()
+    indices, scores = engine.top_k(store.skills(), jobs_packed, k, metric)
+    top_per_job = []
+    for job_indices, job_scores in zip(indices, scores):
+        records = [store.record(int(rows[index])) for index in job_indices]
+        top_per_job.append([
+            {"source": record["candidate_id"], "candidate_name": record["candidate_name"], "score": float(score)}
+            for record, score in zip(records, job_scores)
+        ])
+    return top_per_job
+
+
+# Function to rematch extracted candidates (bulk_ingest.py output) against job descriptions
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score every extracted candidate against every job description and keep the top k per job.")
+    parser.add_argument("candidates", help="JSONL of extracted resumes as written by bulk_ingest.py, or a results store directory (bulk_ingest.py --store)")
+    parser.add_argument("jobs", help='JSONL of {"job_id": ..., "job_description": ...}')
+    parser.add_argument("output", help="JSONL file with the top candidates of each job")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--metric", choices=metrics, default="coverage")
+    args = parser.parse_args(argv)
+
+    with open(args.jobs, encoding="utf-8") as f:
+        jobs = [json.loads(line) for line in f if line.strip()]
+
+    if os.path.isdir(args.candidates):
+        top_per_job = top_stored_candidates(ResultsStore(args.candidates), jobs, args.top_k, args.metric)
+    else:
+        top_per_job = top_extracted_candidates(args.candidates, jobs, args.top_k, args.metric)
+
+    with open(args.output, "w", encoding="utf-8") as output:
+        for job, top in zip(jobs, top_per_job):
+            output.write(json.dumps({"job_id": job.get("job_id"), "candidates": top}, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
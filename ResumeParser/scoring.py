@@ -0,0 +1,35 @@
+from skill_matcher import skill_matcher
+
+
+# Function to map matched keywords to their canonical skills, named the way the
+# Streamlit app displays them; duplicate and alias spellings collapse into one
+def normalize_skills(skills):
+    taxonomy = skill_matcher.taxonomy
+    normalized = set()
+    for skill in skills:
+        skill_id = taxonomy.skill_id(skill)
+        normalized.add(taxonomy.display_names[skill_id] if skill_id is not None else skill.lower().capitalize())
+    return sorted(normalized)
+
+
+# Function to extract normalized skills from a resume or job description text
+def extract_normalized_skills(text):
+    display_names = skill_matcher.taxonomy.display_names
+    return sorted(display_names[skill_id] for skill_id in skill_matcher.match_ids(text))
+
+
+# Function to calculate the matching score: the share of the job's skills the candidate has
+def calculate_matching_score(candidate_skills, job_skills):
+    common_skills = sorted(set(candidate_skills) & set(job_skills))
+
+    if job_skills:
+        score = len(common_skills) / len(set(job_skills))
+    else:
+        score = 0.0
+
+    return score, common_skills
+
+
+# Function to order analyzed candidates from best to worst match
+def rank_candidates(candidates):
+    return sorted(candidates, key=lambda candidate: candidate["score"], reverse=True)
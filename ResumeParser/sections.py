@@ -0,0 +1,140 @@
+import re
+from collections import namedtuple
+
+# A typed section of a resume. start and end are the character offsets of its body
+# in the extracted text, heading_start is where its heading line begins. Whatever
+# comes before the first heading is the "contact" section, which has no heading.
+Section = namedtuple("Section", ["kind", "heading", "heading_start", "start", "end"])
+
+# Heading lines recognised for each kind of section (case-insensitive, a trailing
+# colon is allowed). Kinds no extractor reads still end the section before them.
+section_headings = {
+    "summary": ["summary", "professional summary", "career summary", "profile", "professional profile", "objective", "career objective", "about me"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history", "work history", "internships"],
+    "education": ["education", "academic background", "academic qualifications", "educational qualifications", "qualifications"],
+    "skills": ["skills", "technical skills", "key skills", "core skills", "skill set", "skillset", "core competencies", "competencies"],
+    "certifications": ["certificates", "certifications", "certification", "licenses and certifications", "licenses & certifications", "courses and certifications"],
+    "hobbies": ["hobbies", "interests", "hobbies and interests", "hobbies & interests", "interests and hobbies", "interests & hobbies"],
+    "projects": ["projects", "personal projects", "academic projects"],
+    "references": ["references"],
+    "other": ["languages", "achievements", "awards", "publications", "volunteering", "volunteer experience", "extracurricular activities"],
+}
+
+section_kinds = ("contact",) + tuple(section_headings)
+
+_kinds_by_heading = {heading: kind for kind, headings in section_headings.items() for heading in headings}
+
+
+def _heading_key(heading):
+    return " ".join(heading.lower().split())
+
+
+# One pattern for every heading, anchored to whole lines, so finding all of them is
+# a single left-to-right scan. A heading may carry its body on the same line after
+# a colon ("Skills: Python, SQL").
+def _heading_pattern():
+    alternatives = sorted(_kinds_by_heading, key=len, reverse=True)
+    alternatives = [r"[ \t]+".join(re.escape(word) for word in heading.split(" ")) for heading in alternatives]
+    return re.compile(r"^[ \t]*(" + "|".join(alternatives) + r")[ \t]*(?::[ \t]*|$)", re.IGNORECASE | re.MULTILINE)
+
+
+heading_pattern = _heading_pattern()
+
+
+# Splits text into sections as it arrives, so a caller reading pages one at a time
+# can stop as soon as the section it needs has been closed by the next heading.
+# Each piece of text is scanned on its own, with the unterminated line at its end
+# carried over to the next one, so every line is scanned once and the pieces are
+# only joined when the text is asked for. Offsets are into the joined text. A page
+# boundary always ends a line: when a piece doesn't end with a line break (as PDF
+# pages usually don't), one is put between it and the next, so a heading at the
+# top of a page isn't glued onto the last line of the page before.
+class SectionSegmenter:
+    def __init__(self):
+        self.pages = []
+        self.length = 0
+        self.headings = []
+        self.carry = ""
+        self.has_contact = False
+        self._text = None
+
+    # The text fed so far, joined once and kept until more text is fed
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = "".join(self.pages)
+        return self._text
+
+    # Function to append the next piece of text (e.g. a page) and scan its complete lines
+    def feed(self, text):
+        if self.carry and text:
+            self.pages.append("\n")
+            self.length += 1
+            self.carry += "\n"
+        self.pages.append(text)
+        self._text = None
+        offset = self.length - len(self.carry)
+        self.length += len(text)
+        buffer = self.carry + text
+        end = buffer.rfind("\n") + 1
+        self._scan(buffer, offset, end)
+        self.carry = buffer[end:]
+
+    # Function to scan the last, unterminated line once no more text will come
+    def close(self):
+        self._scan(self.carry, self.length - len(self.carry), len(self.carry))
+        self.carry = ""
+
+    # Scans buffer[:end], which starts at a line start and sits at offset in the text
+    def _scan(self, buffer, offset, end):
+        if end == 0:
+            return
+        for match in heading_pattern.finditer(buffer, 0, end):
+            if not self.headings and buffer[:match.start()].strip():
+                self.has_contact = True
+            start = match.end()
+            if buffer.startswith("\n", start):
+                start += 1
+            kind = _kinds_by_heading[_heading_key(match.group(1))]
+            self.headings.append((kind, match.group(1), offset + match.start(), offset + start))
+        if not self.headings and buffer[:end].strip():
+            self.has_contact = True
+
+    # Function to get the sections found so far. The last one runs to the end of the
+    # text read so far, so it may still grow until close() is called.
+    def sections(self):
+        sections = []
+        first_heading = self.headings[0][2] if self.headings else self.length
+        if self.has_contact or (not self.headings and self.carry.strip()):
+            sections.append(Section("contact", None, 0, 0, first_heading))
+        for index, (kind, heading, heading_start, start) in enumerate(self.headings):
+            end = self.headings[index + 1][2] if index + 1 < len(self.headings) else self.length
+            sections.append(Section(kind, heading, heading_start, start, max(start, end)))
+        return sections
+
+
+# Function to join the bodies of every section of the given kinds
+def section_text(text, sections, kinds):
+    return "\n".join(text[section.start:section.end] for section in sections if section.kind in kinds)
+
+
+# Function to get the contact details above the first heading without segmenting
+# the rest of the text
+def contact_text(text):
+    first_heading = heading_pattern.search(text)
+    return text[:first_heading.start()] if first_heading else text
+
+
+# Function to get the part of the text the skill matcher should read: the skills
+# sections if the resume has any, otherwise everything but the references
+def skills_text(text, sections):
+    if any(section.kind == "skills" for section in sections):
+        return section_text(text, sections, ("skills",))
+    if not any(section.kind == "references" for section in sections):
+        return text
+    return section_text(text, sections, set(section_kinds) - {"references"})
+
+
+# Function to turn sections into plain dicts for JSON responses and caches
+def sections_to_dicts(sections):
+    return [{"kind": section.kind, "heading": section.heading, "start": section.start, "end": section.end} for section in sections]
@@ -0,0 +1,116 @@
+import json
+import sqlite3
+import threading
+from scoring import extract_normalized_skills
+
+
+# Persistent inverted index from each skill to the candidates who have it.
+# A query only reads the postings of the job description's skills, so its
+# cost follows the JD rather than the number of indexed candidates.
+class SkillIndex:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS candidates (
+                candidate_id TEXT PRIMARY KEY,
+                candidate_name TEXT,
+                skills TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                skill TEXT NOT NULL,
+                candidate_id TEXT NOT NULL,
+                PRIMARY KEY (skill, candidate_id)
+            ) WITHOUT ROWID;
+        """)
+
+    # Function to add a candidate, replacing whatever was indexed under the same ID
+    def add_candidate(self, candidate_id, skills, candidate_name=None):
+        self.add_candidates([(candidate_id, skills, candidate_name)])
+
+    # Function to add many (candidate_id, skills, candidate_name) records in one transaction
+    def add_candidates(self, candidates):
+        with self.lock, self.connection:
+            for candidate_id, skills, candidate_name in candidates:
+                skills = sorted(set(skills))
+                self._remove(candidate_id)
+                self.connection.execute(
+                    "INSERT INTO candidates (candidate_id, candidate_name, skills) VALUES (?, ?, ?)",
+                    (candidate_id, candidate_name, json.dumps(skills)),
+                )
+                self.connection.executemany(
+                    "INSERT INTO postings (skill, candidate_id) VALUES (?, ?)",
+                    [(skill, candidate_id) for skill in skills],
+                )
+
+    # Function to remove a candidate; returns False if it wasn't indexed
+    def remove_candidate(self, candidate_id):
+        with self.lock, self.connection:
+            return self._remove(candidate_id)
+
+    def _remove(self, candidate_id):
+        row = self.connection.execute(
+            "SELECT skills FROM candidates WHERE candidate_id = ?", (candidate_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        self.connection.executemany(
+            "DELETE FROM postings WHERE skill = ? AND candidate_id = ?",
+            [(skill, candidate_id) for skill in json.loads(row[0])],
+        )
+        self.connection.execute("DELETE FROM candidates WHERE candidate_id = ?", (candidate_id,))
+        return True
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+    # Function to find the k candidates covering the largest share of the job's skills
+    def top_candidates(self, job_skills, k=10):
+        job_skills = sorted(set(job_skills))
+        if not job_skills or k <= 0:
+            return []
+
+        placeholders = ", ".join("?" * len(job_skills))
+        with self.lock:
+            top = self.connection.execute(
+                f"SELECT candidate_id, COUNT(*) AS common FROM postings WHERE skill IN ({placeholders}) "
+                "GROUP BY candidate_id ORDER BY common DESC, candidate_id LIMIT ?",
+                (*job_skills, k),
+            ).fetchall()
+            if not top:
+                return []
+
+            candidate_ids = [candidate_id for candidate_id, _ in top]
+            id_placeholders = ", ".join("?" * len(candidate_ids))
+            names = dict(self.connection.execute(
+                f"SELECT candidate_id, candidate_name FROM candidates WHERE candidate_id IN ({id_placeholders})",
+                candidate_ids,
+            ).fetchall())
+            common_skills = {candidate_id: [] for candidate_id in candidate_ids}
+            for skill, candidate_id in self.connection.execute(
+                f"SELECT skill, candidate_id FROM postings WHERE skill IN ({placeholders}) "
+                f"AND candidate_id IN ({id_placeholders})",
+                (*job_skills, *candidate_ids),
+            ):
+                common_skills[candidate_id].append(skill)
+
+        return [
+            {
+                "candidate_id": candidate_id,
+                "candidate_name": names.get(candidate_id),
+                "common_skills": sorted(common_skills[candidate_id]),
+                "score": common / len(job_skills),
+            }
+            for candidate_id, common in top
+        ]
+
+    # Function to run a job description through the JD skill extraction and query the index
+    def query(self, job_description_text, k=10):
+        return self.top_candidates(extract_normalized_skills(job_description_text), k)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
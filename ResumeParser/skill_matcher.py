@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+from collections import Counter, defaultdict, namedtuple
+from functools import lru_cache
+from skills_keywords import skills_keywords, skill_aliases
+from taxonomy import SkillTaxonomy, build_taxonomy, normalize_skill, taxonomy_version
+from metrics import timed
+
+# A single skill occurrence in the text, with character offsets
+SkillMatch = namedtuple("SkillMatch", ["skill_id", "skill", "start", "end"])
+
+# Compiled taxonomy and matcher, rebuilt with `python skill_matcher.py`
+artifact_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "skills_taxonomy.pkl")
+
+
+# Turn one keyword character into a regex fragment; whitespace matches any whitespace run
+def _char_pattern(char):
+    return r"\s+" if char == " " else re.escape(char)
+
+
+# Build a trie-backed alternation so the regex engine never retries a shared prefix
+def _trie_pattern(node):
+    if "" in node and len(node) == 1:
+        return ""
+
+    branches = []
+    optional = False
+    for char in sorted(node):
+        if char == "":
+            optional = True
+            continue
+        branches.append(_char_pattern(char) + _trie_pattern(node[char]))
+
+    if len(branches) == 1 and not optional:
+        return branches[0]
+
+    pattern = "(?:" + "|".join(branches) + ")"
+    return pattern + "?" if optional else pattern
+
+
+# Function to compile the single-pass pattern and prefix table for a set of forms
+def _compile_forms(forms):
+    trie = {}
+    for form in forms:
+        node = trie
+        for char in form:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    # A lookahead makes matches zero-width, so a skill starting inside another
+    # one ("testing" in "software testing") is still reported.  The boundaries
+    # are lookarounds on word characters rather than \b, which is what makes
+    # keywords such as "c++", "c#" and ".net" match as whole tokens.
+    pattern = r"(?<!\w)(?=(" + _trie_pattern(trie) + r")(?!\w))"
+
+    # The engine only reports the longest skill at each start offset, so
+    # remember which shorter skills are whole-token prefixes of each form
+    shorter_forms = {}
+    for form in forms:
+        shorter_forms[form] = [
+            other for other in forms
+            if len(other) < len(form)
+            and form.startswith(other)
+            and not (form[len(other)].isalnum() or form[len(other)] == "_")
+        ]
+    return pattern, shorter_forms
+
+
+# Function to check whether the case-insensitive pattern matches a text character
+# against a form character. Unicode case folding lets more than str.lower() match,
+# e.g. "İ" and "ı" match "i", and "ſ" matches "s".
+@lru_cache(maxsize=None)
+def _same_char(form_char, text_char):
+    return re.fullmatch(_char_pattern(form_char), text_char, re.IGNORECASE) is not None
+
+
+# Compiled matcher that finds every skill of a taxonomy in one pass over the text
+class SkillMatcher:
+    def __init__(self, taxonomy, pattern=None, shorter_forms=None):
+        self.taxonomy = taxonomy
+        self.keywords = taxonomy.keywords
+        if pattern is None:
+            pattern, shorter_forms = _compile_forms(list(taxonomy.ids_by_form))
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.shorter_forms = shorter_forms
+        self.forms_by_length = defaultdict(list)
+        for form in taxonomy.ids_by_form:
+            self.forms_by_length[len(form)].append(form)
+
+    # Function to build a matcher straight from a keyword list
+    @classmethod
+    def from_keywords(cls, keywords, aliases=None):
+        return cls(build_taxonomy(keywords, aliases or {}))
+
+    def to_state(self):
+        return {"taxonomy": self.taxonomy.to_state(), "pattern": self.pattern.pattern, "shorter_forms": self.shorter_forms}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(SkillTaxonomy.from_state(state["taxonomy"]), state["pattern"], state["shorter_forms"])
+
+    # Function to find every skill occurrence along with its offsets
+    def find_all(self, text):
+        with timed("skill_matching"):
+            return self._find_all(text)
+
+    def _find_all(self, text):
+        ids_by_form = self.taxonomy.ids_by_form
+        names = self.taxonomy.canonical_names
+        matches = []
+        for match in self.pattern.finditer(text):
+            start = match.start(1)
+            form = self._matched_form(match.group(1))
+            skill_id = ids_by_form[form]
+            matches.append(SkillMatch(skill_id, names[skill_id], start, match.end(1)))
+            for shorter in self.shorter_forms[form]:
+                skill_id = ids_by_form[shorter]
+                end = self._prefix_end(text, start, shorter)
+                matches.append(SkillMatch(skill_id, names[skill_id], start, end))
+        return matches
+
+    # Function to get the taxonomy form a match was made against. Lowercasing gives it
+    # for ASCII text; otherwise the form is found by comparing it character by character
+    # the way the pattern does, since lowercasing can map a character the pattern
+    # matched to another string ("İ" to "i̇") or leave it unmapped ("ı", "ſ").
+    def _matched_form(self, matched):
+        if matched.isascii():
+            return normalize_skill(matched)
+        matched = " ".join(matched.split())
+        for form in self.forms_by_length[len(matched)]:
+            if all(_same_char(form_char, text_char) for form_char, text_char in zip(form, matched)):
+                return form
+        raise ValueError(f"{matched!r} matches no skill form")
+
+    # Locate where a shorter prefix skill ends inside the matched span. The pattern
+    # matches one text character per character of the form (whitespace runs aside),
+    # so the form's own lengths are used, never those of the lowercased text.
+    def _prefix_end(self, text, start, form):
+        words = form.split(" ")
+        position = start
+        for index, word in enumerate(words):
+            if index:
+                while text[position].isspace():
+                    position += 1
+            position += len(word)
+        return position
+
+    # Function to count how often each canonical skill occurs in the text
+    def count(self, text):
+        return Counter(match.skill for match in self.find_all(text))
+
+    # Function to get the canonical IDs of the skills found in the text
+    def match_ids(self, text):
+        return set(match.skill_id for match in self.find_all(text))
+
+    # Function to list the keywords found in the text, in taxonomy order
+    def match_keywords(self, text):
+        found = self.match_ids(text)
+        return [keyword for keyword in self.keywords if self.taxonomy.skill_id(keyword) in found]
+
+
+# Fingerprint of everything the artifact is built from
+def _source_fingerprint():
+    source = json.dumps([taxonomy_version, skills_keywords, skill_aliases])
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+# Function to write the compiled matcher to the on-disk artifact
+def save_skill_matcher(matcher, path=artifact_path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump({"fingerprint": _source_fingerprint(), "matcher": matcher.to_state()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+# Function to load the matcher from the artifact, rebuilding it (and the artifact)
+# if it is missing or was built from a different keyword list
+def load_skill_matcher(path=artifact_path):
+    try:
+        with open(path, "rb") as f:
+            artifact = pickle.load(f)
+        if artifact["fingerprint"] == _source_fingerprint():
+            return SkillMatcher.from_state(artifact["matcher"])
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+        pass
+
+    matcher = SkillMatcher(build_taxonomy())
+    try:
+        save_skill_matcher(matcher, path)
+    except OSError:
+        pass
+    return matcher
+
+
+# Matcher for the shared skills taxonomy, loaded once per process
+skill_matcher = load_skill_matcher()
+
+
+if __name__ == "__main__":
+    save_skill_matcher(SkillMatcher(build_taxonomy()))
+    print(f"Wrote {artifact_path}")
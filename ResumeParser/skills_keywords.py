@@ -62,3 +62,10 @@ skills_keywords = [
     "spring boot",  # Add Spring Boot
     "MVC",  # Add MVC
 ]
+
+# Spellings that mean the same skill as the keyword they are listed under
+skill_aliases = {
+    "CI/CD": ["continuous integration/continuous deployment", "CICD"],
+    "artificial intelligence": ["AI"],
+    "machine learning": ["ML"],
+}
@@ -0,0 +1,107 @@
+import re
+from skills_keywords import skills_keywords, skill_aliases
+
+# Bump whenever the grouping rules below change, so stale artifacts are rebuilt
+taxonomy_version = 1
+
+
+# Function to normalize a keyword or matched span so that case and whitespace runs don't matter
+def normalize_skill(text):
+    return " ".join(text.lower().split())
+
+
+# Canonical skills with stable integer IDs. Every spelling that should count as
+# the same skill (duplicates, case variants, plurals, abbreviations) maps to one ID.
+class SkillTaxonomy:
+    def __init__(self, keywords, canonical_names, ids_by_form):
+        self.keywords = keywords
+        self.canonical_names = canonical_names
+        self.ids_by_form = ids_by_form
+        # Skills as the Streamlit app has always displayed them
+        self.display_names = [name.lower().capitalize() for name in canonical_names]
+
+    # Function to get the canonical ID of any known spelling; None if unknown
+    def skill_id(self, text):
+        return self.ids_by_form.get(normalize_skill(text))
+
+    # Function to list the normalized spellings that belong to each skill ID
+    def forms_by_id(self):
+        forms = [[] for _ in self.canonical_names]
+        for form, skill_id in self.ids_by_form.items():
+            forms[skill_id].append(form)
+        return forms
+
+    def to_state(self):
+        return {"keywords": self.keywords, "canonical_names": self.canonical_names, "ids_by_form": self.ids_by_form}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["keywords"], state["canonical_names"], state["ids_by_form"])
+
+
+# Function to group the keywords into canonical skills. Spellings are grouped when they
+# normalize to the same form, when one is the plural of the other ("Microservice" and
+# "Microservices"), when one is the parenthesised abbreviation of the other ("IaC"), or
+# when they are listed together in skill_aliases. The earliest keyword names the group.
+def build_taxonomy(keywords=skills_keywords, aliases=skill_aliases):
+    keywords = list(keywords)
+    parent = {}
+
+    def find(form):
+        while parent[form] != form:
+            parent[form] = parent[parent[form]]
+            form = parent[form]
+        return form
+
+    def add(form):
+        parent.setdefault(form, form)
+
+    def union(first, second):
+        first, second = find(first), find(second)
+        if first != second:
+            # The root is always the form that was added first
+            if order[second] < order[first]:
+                first, second = second, first
+            parent[second] = first
+
+    order = {}
+    for keyword in keywords:
+        form = normalize_skill(keyword)
+        if form and form not in order:
+            order[form] = len(order)
+            add(form)
+
+    def alias(form, other):
+        if other not in order:
+            order[other] = len(order)
+            add(other)
+        union(form, other)
+
+    for keyword in keywords:
+        form = normalize_skill(keyword)
+        abbreviation = re.fullmatch(r'(.+?)\s*\((.+)\)', form)
+        if abbreviation:
+            alias(form, abbreviation.group(1))
+            alias(form, abbreviation.group(2))
+        if form.endswith("s") and form[:-1] in order:
+            union(form, form[:-1])
+
+    for keyword, spellings in aliases.items():
+        form = normalize_skill(keyword)
+        if form not in order:
+            continue
+        for spelling in spellings:
+            alias(form, normalize_skill(spelling))
+
+    canonical_ids = {}
+    canonical_names = []
+    ids_by_form = {}
+    for keyword in keywords:
+        root = find(normalize_skill(keyword))
+        if root not in canonical_ids:
+            canonical_ids[root] = len(canonical_names)
+            canonical_names.append(keyword)
+    for form in order:
+        ids_by_form[form] = canonical_ids[find(form)]
+
+    return SkillTaxonomy(keywords, canonical_names, ids_by_form)
@@ -0,0 +1,223 @@
+from PyPDF2 import PdfReader
+from io import BytesIO
+from contextlib import contextmanager
+from xml.parsers import expat
+import mmap
+import os
+import re
+import time
+import zipfile
+from metrics import timed, count
+from budgets import ExtractionBudget, current_budget
+
+# WordprocessingML elements that produce text, as the parser reports them
+_w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_text_tag = _w + "t"
+_paragraph_tag = _w + "p"
+_tab_tag = _w + "tab"
+_break_tags = (_w + "br", _w + "cr")
+
+# Parts of a DOCX holding text; the patterns are the ones docx2txt uses
+_docx_body_part = "word/document.xml"
+_docx_header_parts = re.compile(r"word/header[0-9]*.xml")
+_docx_footer_parts = re.compile(r"word/footer[0-9]*.xml")
+
+# Compressed XML is inflated and parsed this many bytes at a time
+_docx_chunk_size = 64 * 1024
+
+
+class UnsupportedDocumentError(Exception):
+    pass
+
+
+# Read-only memory map of a file that the zipfile module accepts as a seekable file
+class MappedDocument(mmap.mmap):
+    def seekable(self):
+        return True
+
+
+# Function to open a document file as a memory-mapped view. Pages are parsed
+# straight from the page cache, so the document never has to be copied into
+# memory, whatever its size.
+@contextmanager
+def open_document(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with MappedDocument(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view
+
+
+# Parsers read bytes through a file object; a memory-mapped view already is one
+def _as_stream(content):
+    return BytesIO(content) if isinstance(content, bytes) else content
+
+
+# Function to tell a PDF from a DOCX by its leading bytes
+def detect_document_type(content):
+    if content[:5] == b"%PDF-":
+        return "pdf"
+    if content[:4] == b"PK\x03\x04":
+        return "docx"
+    return None
+
+
+# Function to yield the text of a PDF one page at a time; pages that are never
+# asked for are never decoded, and neither are those past the budget (by default
+# the one run_budgeted made current)
+def iter_pdf_pages(content, budget=None):
+    budget = budget or current_budget() or ExtractionBudget()
+    count("document_bytes", len(content))
+    with timed("parse"), budget.spending():
+        pdf = PdfReader(_as_stream(content))
+    for page in pdf.pages:
+        if not budget.allows_more():
+            return
+        with timed("extract_page"), budget.spending():
+            text = page.extract_text()
+        count("pages")
+        budget.pages += 1
+        yield budget.take_text(text)
+
+
+# Function to yield the text of one XML part of a DOCX paragraph by paragraph. The
+# part is inflated and parsed a chunk at a time, so neither the XML nor a tree of
+# it is ever held in memory. Each piece starts with the blank line docx2txt puts
+# before a paragraph; tabs and line breaks come out as \t and \n, as they do there.
+def _iter_docx_part(docx, name):
+    pieces = []
+    paragraphs = []
+    in_text = False
+
+    def start_element(tag, attributes):
+        nonlocal in_text
+        # Like ElementTree's .text, only the text before a child element counts
+        in_text = tag == _text_tag
+        if tag == _tab_tag:
+            pieces.append("\t")
+        elif tag in _break_tags:
+            pieces.append("\n")
+        elif tag == _paragraph_tag:
+            if pieces:
+                paragraphs.append("".join(pieces))
+                pieces.clear()
+            pieces.append("\n\n")
+
+    def end_element(tag):
+        nonlocal in_text
+        if tag == _text_tag:
+            in_text = False
+
+    def character_data(data):
+        if in_text:
+            pieces.append(data)
+
+    parser = expat.ParserCreate(namespace_separator="}")
+    parser.buffer_text = True
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+
+    with docx.open(name) as part:
+        while True:
+            chunk = part.read(_docx_chunk_size)
+            parser.Parse(chunk, not chunk)
+            yield from paragraphs
+            paragraphs.clear()
+            if not chunk:
+                break
+    if pieces:
+        yield "".join(pieces)
+
+
+# Function to yield the paragraphs of a DOCX document. Only the main document part
+# is read, plus the headers and footers when asked for (before and after it, as
+# docx2txt orders them); images and other media in the archive are never opened.
+# Joined and stripped, the paragraphs are the text docx2txt.process returns.
+def iter_docx_paragraphs(content, headers_footers=False):
+    with zipfile.ZipFile(_as_stream(content)) as docx:
+        names = docx.namelist()
+        parts = [_docx_body_part]
+        if headers_footers:
+            parts = (
+                [name for name in names if _docx_header_parts.match(name)]
+                + parts
+                + [name for name in names if _docx_footer_parts.match(name)]
+            )
+        for name in parts:
+            yield from _iter_docx_part(docx, name)
+
+
+# Function to yield the text of a DOCX document; it has no pages, so it comes back as one.
+# Headers and footers are included, since resumes often keep the contact details there.
+def iter_docx_pages(content, budget=None):
+    budget = budget or current_budget() or ExtractionBudget()
+    count("document_bytes", len(content))
+    with timed("parse"):
+        paragraphs = []
+        last = time.perf_counter()
+        for paragraph in iter_docx_paragraphs(content, headers_footers=True):
+            now = time.perf_counter()
+            budget.charge(now - last)
+            last = now
+            if not budget.allows_more():
+                break
+            paragraphs.append(budget.take_text(paragraph))
+        budget.charge(time.perf_counter() - last)
+        text = "".join(paragraphs).strip()
+    count("pages")
+    budget.pages += 1
+    yield text
+
+
+# Function to yield the page texts of a PDF or DOCX document
+def iter_document_pages(content, budget=None):
+    document_type = detect_document_type(content)
+    if document_type == "pdf":
+        return iter_pdf_pages(content, budget)
+    if document_type == "docx":
+        return iter_docx_pages(content, budget)
+    raise UnsupportedDocumentError("Unsupported file format. Please upload a PDF or DOCX file.")
+
+
+# Pages of a document that are decoded on first use and remembered, so several
+# extractors can each read as far as they need from a single parse
+class LazyPages:
+    def __init__(self, pages):
+        self.source = iter(pages)
+        self.pages = []
+        self.complete = False
+
+    def __iter__(self):
+        index = 0
+        while True:
+            if index < len(self.pages):
+                yield self.pages[index]
+                index += 1
+            elif self.complete:
+                return
+            else:
+                try:
+                    self.pages.append(next(self.source))
+                except StopIteration:
+                    self.complete = True
+                    return
+
+    # Function to decode any remaining pages and return them all
+    def all(self):
+        for _ in self:
+            pass
+        return self.pages
+
+
+# Function to extract the page texts of a PDF or DOCX document
+def extract_document_pages(content):
+    return list(iter_document_pages(content))
+
+
+# Function to call fn with a memory-mapped view of the file at path in place of its
+# bytes, so worker processes can be handed a path instead of the document itself
+def call_with_document(fn, path, *args):
+    with open_document(path) as content:
+        return fn(content, *args)
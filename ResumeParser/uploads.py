@@ -0,0 +1,128 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import weakref
+from metrics import timed, count
+
+# Largest resume accepted, in bytes; set MAX_UPLOAD_BYTES to change it
+max_upload_bytes = int(os.environ.get("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+
+# Uploads are copied this many bytes at a time, which bounds the memory they take
+upload_chunk_size = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    def __init__(self, max_bytes=max_upload_bytes):
+        self.status_code = 413
+        self.detail = f"The resume is too large, the limit is {max_bytes / (1024 * 1024):.1f} MB"
+
+
+# Function to close and remove a spool file; a no-op if it is already gone
+def _discard_spool_file(file, path):
+    file.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# An uploaded file copied to a temporary file on disk a chunk at a time, hashed
+# on the way in. Parse it through text_extraction.open_document(upload.path) so
+# the pages are read from a memory-mapped view instead of an in-memory copy.
+# The file is removed on close(), or when the upload is garbage collected without
+# being closed, unless it was moved away with move_to().
+class SpooledUpload:
+    def __init__(self, max_bytes=max_upload_bytes, spool_dir=None):
+        self.max_bytes = max_bytes
+        fd, self.path = tempfile.mkstemp(prefix="upload-", suffix=".spool", dir=spool_dir)
+        self.file = os.fdopen(fd, "wb")
+        self.size = 0
+        self.hasher = hashlib.sha256()
+        self.sha256 = None
+        self._finalizer = weakref.finalize(self, _discard_spool_file, self.file, self.path)
+
+    # Function to append a chunk, failing as soon as the upload exceeds max_bytes
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(self.max_bytes)
+        self.hasher.update(chunk)
+        self.file.write(chunk)
+
+    # Function to mark the upload complete; sha256 is the parse cache key of the document
+    def finish(self):
+        self.file.close()
+        self.sha256 = self.hasher.hexdigest()
+        count("upload_bytes", self.size)
+        return self
+
+    # Function to read the whole upload into memory, for stores that keep bytes
+    def read_bytes(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    # Function to hand the spool file over to its new owner, e.g. the document store.
+    # It appears at path in one step, even when it has to be copied across filesystems.
+    def move_to(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.move(self.path, tmp_path)
+        os.replace(tmp_path, path)
+        self._finalizer.detach()
+        self.path = None
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+        if self.path is not None:
+            self._finalizer()
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Function to spool a FastAPI UploadFile. Files whose size is already known to be
+# over the limit are rejected before a single byte is copied.
+async def spool_upload(file, max_bytes=max_upload_bytes, spool_dir=None):
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    upload = SpooledUpload(max_bytes, spool_dir)
+    try:
+        with timed("upload"):
+            while True:
+                chunk = await file.read(upload_chunk_size)
+                if not chunk:
+                    break
+                upload.write(chunk)
+        return upload.finish()
+    except BaseException:
+        upload.close()
+        raise
+
+
+# Function to spool any readable binary stream, e.g. a Streamlit UploadedFile
+def spool_stream(stream, max_bytes=max_upload_bytes, spool_dir=None):
+    size = getattr(stream, "size", None)
+    if size is not None and size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    upload = SpooledUpload(max_bytes, spool_dir)
+    try:
+        with timed("upload"):
+            # Streamlit reruns hand over the same file object, possibly already read
+            if hasattr(stream, "seek"):
+                stream.seek(0)
+            while True:
+                chunk = stream.read(upload_chunk_size)
+                if not chunk:
+                    break
+                upload.write(chunk)
+        return upload.finish()
+    except BaseException:
+        upload.close()
+        raise
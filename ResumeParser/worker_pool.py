@@ -0,0 +1,75 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from metrics import run_recorded, merge_recorded, timed
+
+
+class PoolBusyError(Exception):
+    def __init__(self):
+        self.status_code = 503
+        self.detail = "Server is busy processing other resumes, please retry shortly"
+
+
+class PoolTimeoutError(Exception):
+    def __init__(self):
+        self.status_code = 504
+        self.detail = "Timed out while processing the resume"
+
+
+# Process pool for CPU-bound extraction, so parsing never blocks the event loop.
+# At most max_pending calls may be queued or running; further calls fail fast
+# with PoolBusyError instead of waiting behind them.
+class ExtractionPool:
+    def __init__(self, max_workers=None, max_pending=None, timeout=30):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.timeout = timeout
+        self.pending = 0
+        self.executor = None
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    # A call only frees its slot once the worker is really done with it, so
+    # timed out calls still count against max_pending while they run
+    def _release(self, future):
+        self.pending -= 1
+
+    # Function to run fn(*args) in a worker process and wait for its result. The
+    # spans fn records in the worker are folded into this process's metrics.
+    async def run(self, fn, *args, timeout=None):
+        if self.pending >= self.max_pending:
+            raise PoolBusyError()
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._get_executor().submit(run_recorded, fn, *args)
+        except BrokenProcessPool:
+            self.executor = None
+            future = self._get_executor().submit(run_recorded, fn, *args)
+
+        self.pending += 1
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+
+        try:
+            with timed("worker_call"):
+                result, spans, counts = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+            merge_recorded(spans, counts)
+            return result
+        except asyncio.TimeoutError:
+            raise PoolTimeoutError()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool for the next call
+            self.executor = None
+            raise
+
+    def stats(self):
+        return {"workers": self.max_workers, "pending": self.pending, "max_pending": self.max_pending}
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None